@@ -1,8 +1,10 @@
 # A collection of functions which will cache things.
 
+import ctypes
 import json
 import os
 import os.path as op
+import sys
 from logging import getLogger
 from typing import Optional
 
@@ -16,6 +18,18 @@ logger = getLogger(__name__)
 # "handle-module" cache to avoid having to get the handles and such every time we need to do a look up.
 hm_cache: dict[str, tuple[int, MODULEINFO]] = {}
 
+# The running binary loaded as a dll so that its exported functions can be looked up.
+_own_dll: Optional[ctypes.WinDLL] = None
+
+
+def get_own_dll() -> ctypes.WinDLL:
+    """Get the running binary as a dll so that its exported functions can be found.
+    This is only loaded the first time it's needed."""
+    global _own_dll
+    if _own_dll is None:
+        _own_dll = ctypes.WinDLL(_internal.BINARY_PATH)
+    return _own_dll
+
 
 class OffsetCache:
     """A simple cache to store offsets once they have been found within a particular binary.
@@ -31,10 +45,15 @@ class OffsetCache:
 
     def load(self):
         """Load the data."""
-        logger.debug(f"loading cache {self.path}")
+        logger.debug("loading cache %s", self.path)
         if op.exists(self.path):
             with open(self.path, "r") as f:
-                self._lookup = json.load(f)
+                # Intern the patterns so that looking them up with the (also interned) patterns from the hooks
+                # can match them by identity.
+                self._lookup = {
+                    binary: {sys.intern(pattern): offset for pattern, offset in offsets.items()}
+                    for binary, offsets in json.load(f).items()
+                }
                 self.loaded = True
 
     def save(self):
@@ -46,16 +65,13 @@ class OffsetCache:
 
     def get(self, pattern: str, binary: Optional[str] = None) -> Optional[int]:
         """Get the offset based on the pattern provided."""
-        return self._lookup.get(binary or _internal.EXE_NAME, {}).get(pattern)
+        if (binary_lookup := self._lookup.get(binary or _internal.EXE_NAME)) is None:
+            return None
+        return binary_lookup.get(pattern)
 
     def set(self, pattern: str, offset: int, binary: Optional[str] = None, save: bool = True):
         """Set the pattern with the given value and optionally save."""
-        _binary = binary
-        if _binary is None:
-            _binary = _internal.EXE_NAME
-        if _binary not in self._lookup:
-            self._lookup[_binary] = {}
-        self._lookup[_binary][pattern] = offset
+        self._lookup.setdefault(binary or _internal.EXE_NAME, {})[sys.intern(pattern)] = offset
         if save:
             self.save()
 
@@ -1,9 +1,10 @@
-from ctypes import CFUNCTYPE, WinDLL
+from ctypes import CFUNCTYPE
 from logging import getLogger
 from typing import Any, Optional
 
 import pymhf.core._internal as _internal
 from pymhf.core._types import FUNCDEF
+from pymhf.core.caching import get_own_dll
 from pymhf.core.errors import UnknownFunctionError
 from pymhf.core.memutils import _get_binary_info, find_pattern_in_binary
 from pymhf.core.module_data import module_data
@@ -11,6 +12,10 @@ from pymhf.core.utils import saferun_decorator
 
 calling_logger = getLogger("CallingManager")
 
+# The function pointers created by `call_function`, keyed by the arguments used to find them. The location and
+# signature of a function doesn't change once found, so we only need to do the lookups once.
+_cfunc_cache: dict[tuple, Any] = {}
+
 
 # TODO: Everything in this file is deprecated. DO NOT use it.
 
@@ -29,10 +34,9 @@ def call_exported(name: str, func_def: FUNCDEF, *args):
     args:
         The arguments to be passed to the function being called.
     """
-    # TODO: Improve this so that the own_dll is cached as well as the func_def so that we only incur a slight
-    # performance hit the very first time.
-    own_dll = WinDLL(_internal.BINARY_PATH)
-    func_ptr = getattr(own_dll, name)
+    # Index the dll rather than getting the function as an attribute so that we get a new function pointer
+    # instead of the one cached on the dll, since its restype and argtypes are set below.
+    func_ptr = get_own_dll()[name]
     func_ptr.restype = func_def.restype
     func_ptr.argtypes = func_def.argtypes
     return func_ptr(*args)
@@ -69,6 +73,13 @@ def call_function(
         The name of the binary to search for the pattern within, or to find the offset relative to.
         If not provided, will fallback to the name of the binary as provided by the `exe` config value.
     """
+    # Only cache functions whose signature comes from the module data since a provided FUNCDEF may change
+    # between calls.
+    cache_key = None
+    if func_def is None:
+        cache_key = (name, overload, pattern, offset, binary)
+        if (cached_cfunc := _cfunc_cache.get(cache_key)) is not None:
+            return cached_cfunc(*args)
     if func_def is not None:
         _sig = func_def
     else:
@@ -86,7 +97,7 @@ def call_function(
                     if (opattern := _pattern.get(overload)) is not None:
                         offset = find_pattern_in_binary(opattern, False, binary)
                     else:
-                        first = list(_pattern.items())[0]
+                        first = next(iter(_pattern.items()))
                         calling_logger.warning(f"No pattern overload was provided for {name}. ")
                         calling_logger.warning(f"Falling back to the first overload ({first[0]})")
                         offset = find_pattern_in_binary(first[1], False, binary)
@@ -106,7 +117,7 @@ def call_function(
             # Need to fallback on something. Raise a warning that no
             # overload was defined and that it will fallback to the
             # first entry in the dict.
-            first = list(_sig.items())[0]
+            first = next(iter(_sig.items()))
             calling_logger.warning(f"No function arguments overload was provided for {name}. ")
             calling_logger.warning(f"Falling back to the first overload ({first[0]})")
             sig = CFUNCTYPE(first[1].restype, *first[1].argtypes)
@@ -120,16 +131,17 @@ def call_function(
         if (_offset := offset.get(overload)) is not None:  # type: ignore
             offset = _offset
         else:
-            _offset = list(offset.items())[0]
+            _offset = next(iter(offset.items()))
             calling_logger.warning(f"No function arguments overload was provided for {name}. ")
             calling_logger.warning(f"Falling back to the first overload ({_offset[0]})")
             offset = _offset[1]
     binary_base = _internal.BASE_ADDRESS
-    # TODO: This is inefficient to look it up every time. This should be optimised at some point.
     if binary is not None:
         if (hm := _get_binary_info(binary)) is not None:
             _, module = hm
             binary_base = module.lpBaseOfDll
 
     cfunc = sig(binary_base + offset)
+    if cache_key is not None:
+        _cfunc_cache[cache_key] = cfunc
     return cfunc(*args)
@@ -20,6 +20,7 @@ class FuncDef:
         self._arg_names = [x.name for x in argtypes]
         self._arg_types = [x.arg_type for x in argtypes]
         self.defaults = defaults or dict()
+        self._FUNCDEF: Optional[FUNCDEF] = None
 
     @property
     def arg_types(self) -> list[Type[CTYPES]]:
@@ -30,10 +31,18 @@ class FuncDef:
         return self._arg_names
 
     def to_FUNCDEF(self) -> FUNCDEF:
-        return FUNCDEF(self.restype, self.arg_types)
+        # FuncDef's are shared between everything which uses the same function (see `_get_funcdef`), so only
+        # create the FUNCDEF once so that every hook for the function gets the same one.
+        if self._FUNCDEF is None:
+            self._FUNCDEF = FUNCDEF(self.restype, self.arg_types)
+        return self._FUNCDEF
 
     def flatten(self, *args, **kwargs):
         """Take the provided signature, args and kwargs and convert to a single list of args."""
+        # By far the most common case is for all the arguments to be passed positionally, in which case there
+        # is nothing to do.
+        if not kwargs and len(args) == len(self._arg_names):
+            return list(args)
         out_args = {}
         missing = []
         # First, apply the arg values
@@ -55,12 +64,50 @@ class FuncDef:
         return list(out_args.values())
 
 
+def _get_parameters(func: Callable) -> list[tuple[str, Any]]:
+    """Get the name and default value of each argument of the function, in order.
+    Arguments without a default value have a default of ``inspect.Parameter.empty``.
+    This gives the same arguments as ``inspect.signature`` (so for bound methods the bound argument isn't
+    included), but is read directly off the code object as constructing the full signature is comparatively
+    slow.
+    """
+    code = getattr(func, "__code__", None)
+    if code is None or hasattr(func, "__wrapped__"):
+        # Fallback for callables which aren't plain functions, or which wrap another function, since the
+        # signature is that of the wrapped function.
+        return [(name, param.default) for name, param in inspect.signature(func).parameters.items()]
+    n_positional = code.co_argcount
+    n_kwonly = code.co_kwonlyargcount
+    varnames = code.co_varnames
+    # The code object has the names of the positional arguments, then keyword-only arguments, then `*args`
+    # and `**kwargs` (if the function has them). Reorder them to match the order in the signature.
+    names = list(varnames[:n_positional])
+    i = n_positional + n_kwonly
+    if code.co_flags & inspect.CO_VARARGS:
+        names.append(varnames[i])
+        i += 1
+    names.extend(varnames[n_positional : n_positional + n_kwonly])
+    if code.co_flags & inspect.CO_VARKEYWORDS:
+        names.append(varnames[i])
+    defaults = dict(getattr(func, "__kwdefaults__", None) or {})
+    # Positional defaults apply to the last positional arguments.
+    if positional_defaults := getattr(func, "__defaults__", None):
+        positional_names = varnames[n_positional - len(positional_defaults) : n_positional]
+        defaults.update(zip(positional_names, positional_defaults))
+    params = [(name, defaults.get(name, inspect.Parameter.empty)) for name in names]
+    if inspect.ismethod(func) and n_positional:
+        # The first argument is already bound. If there are no positional arguments it is taken by `*args`,
+        # which is still part of the signature.
+        return params[1:]
+    return params
+
+
 @lru_cache(maxsize=1024)
 def _get_funcdef(func: Callable) -> FuncDef:
     """Get the funcdef for the provided function.
     This is wrapped in an lru_cache so that if multiple detours use the same function, it will only be
     analysed once."""
-    func_params = inspect.signature(func).parameters
+    func_params = _get_parameters(func)
     func_type_hints = get_type_hints(func, include_extras=True)
     _restype = func_type_hints.pop("return", type(None))
     if _restype is type(None):
@@ -72,7 +119,7 @@ def _get_funcdef(func: Callable) -> FuncDef:
     argtypes = []
     defaults = {}
     _missing = []
-    for name, param in func_params.items():
+    for name, default_val in func_params:
         if name != "self":
             if name in func_type_hints:
                 argtype = func_type_hints[name]
@@ -87,8 +134,7 @@ def _get_funcdef(func: Callable) -> FuncDef:
                             "`Annotated[int, ctypes.c_int32]`."
                         )
                 if issubclass(argtype, get_args(CTYPES)):
-                    default_val = param.default
-                    if default_val != inspect.Signature.empty:
+                    if default_val is not inspect.Parameter.empty:
                         defaults[name] = default_val
                     argtypes.append(ArgData(name, argtype))
                 else:
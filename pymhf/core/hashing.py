@@ -6,6 +6,7 @@ from io import BufferedReader
 
 import psutil
 import pymem
+import pymem.memory
 from pymem.ressources.structure import (
     MEMORY_BASIC_INFORMATION,
     MEMORY_BASIC_INFORMATION32,
@@ -76,19 +77,19 @@ def _get_main_module(pm_binary: pymem.Pymem) -> MODULEINFO:
     return main_module
 
 
-def _get_sections_info(pm_binary: pymem.Pymem, address: int) -> tuple[int, int]:
+def _get_sections_info(handle: int, address: int) -> tuple[int, int]:
     """Get the base address and number of sections in the PE file at the given address."""
-    dos_header = cast(IMAGE_DOS_HEADER, pm_binary.read_ctype(address, IMAGE_DOS_HEADER()))
+    dos_header = cast(IMAGE_DOS_HEADER, pymem.memory.read_ctype(handle, address, IMAGE_DOS_HEADER()))
     if dos_header.e_magic != IMAGE_DOS_SIGNATURE:
         raise ValueError(f"Invalid DOS header magic for address 0x{address:X}")
 
     address += dos_header.e_lfanew
-    signature = pm_binary.read_ctype(address, wintypes.DWORD())
+    signature = pymem.memory.read_ctype(handle, address, wintypes.DWORD())
     if signature != IMAGE_NT_SIGNATURE:
         raise ValueError(f"Invalid PE header signature for address 0x{address:X}")
 
     address += ctypes.sizeof(wintypes.DWORD)
-    file_header = cast(IMAGE_FILE_HEADER, pm_binary.read_ctype(address, IMAGE_FILE_HEADER()))
+    file_header = cast(IMAGE_FILE_HEADER, pymem.memory.read_ctype(handle, address, IMAGE_FILE_HEADER()))
 
     num_sections = int(file_header.NumberOfSections)
     opt_header_size = int(file_header.SizeOfOptionalHeader)
@@ -97,24 +98,21 @@ def _get_sections_info(pm_binary: pymem.Pymem, address: int) -> tuple[int, int]:
     return sections_base, num_sections
 
 
-def _get_read_only_sections(
-    pm_binary: pymem.Pymem,
+def _get_sections(
+    handle: int,
     sections_base: int,
     num_sections: int,
     max_module_size: int,
-):
-    """Get a list of read-only sections in the PE file at the given address."""
+) -> list[tuple[int, int, str, int]]:
+    """Get the relative address, size, name and characteristics of each section in the PE file whose section
+    headers start at the given address. The sections are clamped to the size of the module."""
     sections = []
     for i in range(num_sections):
         section_address = sections_base + i * ctypes.sizeof(IMAGE_SECTION_HEADER)
         section_header = cast(
-            IMAGE_SECTION_HEADER, pm_binary.read_ctype(section_address, IMAGE_SECTION_HEADER())
+            IMAGE_SECTION_HEADER, pymem.memory.read_ctype(handle, section_address, IMAGE_SECTION_HEADER())
         )
 
-        characteristics = section_header.Characteristics
-        if not (characteristics & IMAGE_SCN_MEM_EXECUTE) or (characteristics & IMAGE_SCN_MEM_WRITE):
-            continue
-
         virtual_addr = int(section_header.VirtualAddress)
         virtual_size = int(section_header.Misc.VirtualSize) or int(section_header.SizeOfRawData)
         if virtual_addr == 0 or virtual_size == 0:
@@ -128,12 +126,29 @@ def _get_read_only_sections(
             virtual_addr,
             end_addr - virtual_addr,
             bytes(bytearray(section_header.Name)).rstrip(b"\x00").decode(errors="ignore"),
+            int(section_header.Characteristics),
         )
         sections.append(section)
 
     return sections
 
 
+def _get_read_only_sections(
+    handle: int,
+    sections_base: int,
+    num_sections: int,
+    max_module_size: int,
+):
+    """Get a list of read-only sections in the PE file at the given address."""
+    return [
+        (virtual_addr, size, name)
+        for virtual_addr, size, name, characteristics in _get_sections(
+            handle, sections_base, num_sections, max_module_size
+        )
+        if (characteristics & IMAGE_SCN_MEM_EXECUTE) and not (characteristics & IMAGE_SCN_MEM_WRITE)
+    ]
+
+
 def hash_bytes_from_file(fileobj: BufferedReader, _bufsize: int = 2**18) -> str:
     # Essentially implement hashlib.file_digest since it's python 3.11+
     # cf. https://github.com/python/cpython/blob/main/Lib/hashlib.py#L195
@@ -166,8 +181,8 @@ def hash_bytes_from_memory(pm_binary: pymem.Pymem, _bufsize: int = 2**18) -> str
     if not base_address or not module_size:
         raise OSError("Failed to resolve main module base/size")
 
-    sections_base, num_sections = _get_sections_info(pm_binary, base_address)
-    sections = _get_read_only_sections(pm_binary, sections_base, num_sections, module_size)
+    sections_base, num_sections = _get_sections_info(process_handle, base_address)
+    sections = _get_read_only_sections(process_handle, sections_base, num_sections, module_size)
     if not sections:
         raise ValueError("No read-only sections found in the main module")
     sections.sort(key=lambda s: s[0])
@@ -1,15 +1,18 @@
-import ast
 import ctypes
-import inspect
+import functools
 import logging
 import struct
-import traceback
+import sys
+import textwrap
 from collections import defaultdict
-from collections.abc import Callable
+from collections.abc import Callable, Iterable, Mapping
 from ctypes import CFUNCTYPE
+from types import CodeType, FunctionType, MappingProxyType
 from typing import Any, Optional, Type, Union
 
 import cyminhook
+from cyminhook._cyminhook import Error as MinHookError  # type: ignore
+from cyminhook._cyminhook import Status as MinHookStatus  # type: ignore
 from typing_extensions import Concatenate, Generic, ParamSpec, Self, TypeVar, deprecated
 
 import pymhf.core._internal as _internal
@@ -23,8 +26,15 @@ from pymhf.core._types import (
     KeyPressProtocol,
     ManualHookProtocol,
 )
-from pymhf.core.functions import FuncDef, _get_funcdef
-from pymhf.core.memutils import _get_binary_info, find_pattern_in_binary, get_addressof, map_struct
+from pymhf.core.caching import get_own_dll
+from pymhf.core.functions import FuncDef, _get_funcdef, _get_parameters
+from pymhf.core.memutils import (
+    _get_binary_info,
+    find_pattern_in_binary,
+    find_patterns_in_binary,
+    get_addressof,
+    map_struct,
+)
 from pymhf.utils.iced import HAS_ICED, generate_load_stack_pointer_bytes, get_first_jmp_addr
 
 logger = logging.getLogger(__name__)
@@ -34,28 +44,306 @@ BITS = struct.calcsize("P") * 8
 
 
 # Currently unused, but can maybe figure out how to utilise it.
-# It currently doesn't work I think because we subclass from the cyminhook class
-# which is cdef'd, and I guess ast falls over trying to get the actual source...
-# Can possible use annotations and inspect the return type (return `None`
-# explictly eg.) to give some hints. Maybe just raise warnings etc.
+# Can possible use annotations and inspect the return type (return `None` explictly eg.) to give some hints.
+# Maybe just raise warnings etc.
 def _detour_is_valid(f):
-    for node in ast.walk(ast.parse(inspect.getsource(f))):
-        if isinstance(node, ast.Return):
-            return True
+    """Determine whether the function can return something other than ``None``.
+    This inspects the compiled bytecode rather than the source so that it doesn't need to read the source file
+    from disk and parse it, and so that it works for any function which has a code object.
+    """
+    return _code_returns_value(f.__code__)
+
+
+@functools.lru_cache(maxsize=None)
+def _code_returns_value(code: CodeType) -> bool:
+    # Imported here since this is the only place it's used and it isn't otherwise needed at import time.
+    import dis
+
+    prev_instr = None
+    for instr in dis.get_instructions(code):
+        # Python 3.12+ has a dedicated opcode for returning a constant.
+        if instr.opname == "RETURN_CONST":
+            if instr.argval is not None:
+                return True
+        elif instr.opname == "RETURN_VALUE":
+            # Older versions load the constant and then return it, so check what was loaded.
+            if prev_instr is None or not (prev_instr.opname == "LOAD_CONST" and prev_instr.argval is None):
+                return True
+        prev_instr = instr
     return False
 
 
-_FunctionHook_overloads: dict = defaultdict(lambda: dict())
+def _has_result_param(detour: Callable[..., Any]) -> bool:
+    """Determine whether the detour has a ``_result_`` argument."""
+    return any(name == "_result_" for name, _ in _get_parameters(detour))
+
+
+def _set_detour_time(detour: Callable[..., Any], detour_time: DetourTime):
+    """Set when the detour is to be run.
+    For after detours, this also records whether the detour takes the ``_result_`` argument so that which of
+    the detour lists it belongs in is known before it's registered.
+    """
+    setattr(detour, "_hook_time", detour_time)
+    setattr(detour, "_has__result_", detour_time is DetourTime.AFTER and _has_result_param(detour))
+
+
+# Returned for any detour which doesn't have a `__dict__` so that it looks like no flags have been set on it.
+_NO_DETOUR_FLAGS: Mapping[str, Any] = MappingProxyType({})
+
+
+def _detour_flags(detour: Callable[..., Any]) -> Mapping[str, Any]:
+    """Get the attributes set on the detour by the hook decorators.
+    These are always set directly on the function, so reading them from its ``__dict__`` avoids going through
+    the full attribute lookup for each flag. Bound methods forward ``__dict__`` to the underlying function.
+    """
+    return getattr(detour, "__dict__", _NO_DETOUR_FLAGS)
+
+
+# Source for the functions which are run when a hooked function is called. These are compiled for the exact
+# number of arguments the hooked function takes so that the arguments can be passed along positionally rather
+# than being packed into a tuple and unpacked again at each step. `{args}` is replaced by the argument names
+# and `{args_prefix}` by the same followed by a comma (or nothing if there are no arguments).
+# The names used in these functions which aren't arguments are provided when the function is created and are
+# bound as closure variables so that looking them up on each call is as cheap as possible.
+_DISPATCHER_SOURCES = {
+    "_single_before": """
+def _single_before({args}):
+    try:
+        ret = before({args})
+    except Exception:
+        disable_detour(before_detours, before)
+        ret = None
+    if ret is None:
+        return original({args})
+    return original(*ret)
+""",
+    "_before_only": """
+def _before_only({args}):
+    ret = None
+    func = None
+    try:
+        for func in befores:
+            r = func({args})
+            if r is not None:
+                ret = r
+    except Exception:
+        disable_detour(before_detours, func)
+    if ret is None:
+        return original({args})
+    return original(*ret)
+""",
+    # The before detours are called one after the other without a loop. `{calls}` is replaced by a copy of
+    # `_UNROLLED_BEFORE_CALL` for each detour.
+    "_before_unrolled": """
+def _before_unrolled({args}):
+    ret = None
+    func = None
+    try:
+{calls}
+    except Exception:
+        disable_detour(before_detours, func)
+    if ret is None:
+        return original({args})
+    return original(*ret)
+""",
+    # If any of the before detours are NOOP's, the original function isn't called and the last non-None
+    # value returned by the detours is the result.
+    "_noop_before_only": """
+def _noop_before_only({args}):
+    ret = None
+    func = None
+    try:
+        for func in befores:
+            r = func({args})
+            if r is not None:
+                ret = r
+    except Exception:
+        disable_detour(before_detours, func)
+    return ret
+""",
+    "_single_after": """
+def _single_after({args}):
+    result = original({args})
+    try:
+        after_ret = after({args})
+    except Exception:
+        disable_detour(after_detours, after)
+        return result
+    if after_ret is not None:
+        return after_ret
+    return result
+""",
+    "_single_after_with_result": """
+def _single_after_with_result({args}):
+    result = original({args})
+    try:
+        after_ret = after_with_result({args_prefix}_result_=result)
+    except Exception:
+        disable_detour(after_detours_with_results, after_with_result)
+        return result
+    if after_ret is not None:
+        return after_ret
+    return result
+""",
+    "_after_only": """
+def _after_only({args}):
+    result = original({args})
+    after_ret = None
+    func = None
+    needs_result = False
+    try:
+        for func in afters:
+            after_ret = func({args})
+        needs_result = True
+        for func in afters_with_results:
+            after_ret = func({args_prefix}_result_=result)
+    except Exception:
+        if needs_result:
+            disable_detour(after_detours_with_results, func)
+        else:
+            disable_detour(after_detours, func)
+    if after_ret is not None:
+        return after_ret
+    return result
+""",
+    "_before_and_after": """
+def _before_and_after({args}):
+    ret = None
+    func = None
+    try:
+        for func in befores:
+            r = func({args})
+            if r is not None:
+                ret = r
+    except Exception:
+        disable_detour(before_detours, func)
+    if ret is None:
+        result = original({args})
+    else:
+        result = original(*ret)
+    after_ret = None
+    func = None
+    needs_result = False
+    try:
+        for func in afters:
+            after_ret = func({args})
+        needs_result = True
+        for func in afters_with_results:
+            after_ret = func({args_prefix}_result_=result)
+    except Exception:
+        if needs_result:
+            disable_detour(after_detours_with_results, func)
+        else:
+            disable_detour(after_detours, func)
+    if after_ret is not None:
+        return after_ret
+    return result
+""",
+}
+
+
+_UNROLLED_BEFORE_CALL = """
+        func = before_{i}
+        r = func({args})
+        if r is not None:
+            ret = r"""
+# The most before detours which will be unrolled. Any more than this and they are looped over instead.
+_MAX_UNROLLED_BEFORE = 4
+
+
+# The function given to minhook. Unlike the dispatchers, `dispatcher` is looked up from the function's globals
+# on each call so that it can be replaced. See `FuncHook._set_dispatcher`.
+_ENTRY_SOURCE = """
+def _dispatch({args}):
+    return dispatcher({args})
+"""
+
+
+def _arg_names(arity: int) -> str:
+    return ", ".join(f"a{i}" for i in range(arity))
+
+
+@functools.lru_cache(maxsize=None)
+def _compile_entry(arity: int) -> CodeType:
+    return compile(_ENTRY_SOURCE.format(args=_arg_names(arity)), "<pymhf dispatcher _dispatch>", "exec")
+
+
+def _make_entry(arity: int, namespace: dict[str, Any]) -> Callable[..., Any]:
+    """Create the function given to minhook for a function with the given number of arguments.
+    ``namespace`` is used as the globals of the function and must contain the current ``dispatcher``.
+    """
+    exec(_compile_entry(arity), namespace)
+    return namespace["_dispatch"]
+
+
+@functools.lru_cache(maxsize=None)
+def _compile_dispatcher(name: str, arity: int, count: int, free_names: tuple[str, ...]) -> CodeType:
+    args = _arg_names(arity)
+    args_prefix = f"{args}, " if arity else ""
+    calls = "".join(_UNROLLED_BEFORE_CALL.format(i=i, args=args) for i in range(count))
+    source = _DISPATCHER_SOURCES[name].format(args=args, args_prefix=args_prefix, calls=calls)
+    # Wrap the dispatcher in a function which takes the names it uses as arguments so that it closes over
+    # them.
+    source = f"def _factory({', '.join(free_names)}):\n{textwrap.indent(source, '    ')}\n    return {name}\n"
+    return compile(source, f"<pymhf dispatcher {name}>", "exec")
+
+
+def _make_dispatcher(name: str, arity: int, namespace: dict[str, Any], count: int = 0) -> Callable[..., Any]:
+    """Create the named dispatcher for a function with the given number of arguments.
+    ``namespace`` provides the values of all the names the dispatcher uses other than its arguments.
+    ``count`` is the number of detours to unroll for dispatchers which do so.
+    """
+    factory_namespace: dict[str, Any] = {}
+    exec(_compile_dispatcher(name, arity, count, tuple(sorted(namespace))), factory_namespace)
+    return factory_namespace["_factory"](**namespace)
+
+
+_FunctionHook_overloads: dict[str, dict[Optional[str], "FunctionHook"]] = {}
+
+
+def _status_label(status: MinHookStatus) -> str:
+    """Get a readable description of a minhook status.
+    Eg. `MH_ERROR_NOT_EXECUTABLE` -> "ERROR NOT EXECUTABLE"."""
+    return status.name[3:].replace("_", " ")
 
 
 # TODO: Move to a different file with `Mod` from mod_loader.py
 class FuncHook(cyminhook.MinHook):
+    # NOTE: `original`, `target`, `detour` and `signature` are attributes defined on the cyminhook base class
+    # so they must not be included in the slots.
+    __slots__ = (
+        "_binary",
+        "_binary_base",
+        "_offset",
+        "_offset_is_absolute",
+        "_func_def",
+        "_rsp_addr",
+        "_has_noop",
+        "_get_caller",
+        "_before_detours",
+        "_after_detours",
+        "_after_detours_with_results",
+        "_disabled_detours",
+        "_active_detours",
+        "_oneshot_detours",
+        "_dispatcher",
+        "_entry_namespace",
+        "_before_chain",
+        "_after_chain",
+        "_after_with_results_chain",
+        "_invalid",
+        "_name",
+        "_full_name",
+        "overload",
+        "state",
+    )
+
     original: Callable[..., Any]
     target: int
     detour: Callable[..., Any]
     signature: Callable[..., Any]
     _name: str
-    _invalid: bool = False
+    _invalid: bool
     _func_def: Optional[FUNCDEF]
     _offset_is_absolute: bool
 
@@ -92,68 +380,90 @@ class FuncHook(cyminhook.MinHook):
         self._func_def = func_def
         self._binary = binary
 
-        # Depending on the bitness, create the variable to hold the return address.
-        if BITS == 64:
-            self._rsp_addr = ctypes.c_ulonglong(0)
-        else:
-            self._rsp_addr = ctypes.c_ulong(0)
-
-        self.signature = CFUNCTYPE(self._func_def.restype, *self._func_def.argtypes)
+        # The variable to hold the return address. This is only needed by hooks which get the caller, so it's
+        # created when the hook is initialized if it's needed. See `HookManager.initialize_hooks`.
+        self._rsp_addr: Union[ctypes.c_ulonglong, ctypes.c_ulong, None] = None
 
         self._has_noop = False
-        self._before_detours: list[HookProtocol] = []
-        self._after_detours: list[HookProtocol] = []
-        self._after_detours_with_results: list[HookProtocol] = []
+        # Whether any of the detours want the address the hooked function is called from.
+        self._get_caller = False
+        # The detours are stored as the keys of dicts so that they are kept in the order they were added, but
+        # can be removed without having to search for them.
+        self._before_detours: dict[Union[HookProtocol, Callable], None] = {}
+        self._after_detours: dict[Union[HookProtocol, Callable], None] = {}
+        self._after_detours_with_results: dict[Union[HookProtocol, Callable], None] = {}
         # Disabled detours will go here. This will include hooks disabled by the
         # @disable decorator, as well as hooks which are one-shots and have been
         # run.
         self._disabled_detours: set[HookProtocol] = set()
+        # Every detour (or one-shot wrapper) which is currently in one of the detour lists above. This lets us
+        # check whether a detour needs removing without scanning the lists.
+        self._active_detours: set[Union[HookProtocol, Callable]] = set()
         self._oneshot_detours: dict[HookProtocol, Callable] = {}
+        # The function which is actually run when the hooked function is called. This is swapped out for a
+        # more specialised one depending on which detours are registered. See `_update_dispatcher`.
+        self._dispatcher: Callable[..., Any] = self._compound_detour
+        # The namespace of the function given to minhook when the hook is bound. minhook only wraps the detour
+        # once, so the function it calls looks up the current dispatcher from here. See `_set_dispatcher`.
+        self._entry_namespace: Optional[dict[str, Any]] = None
+        # Snapshots of the detour lists which are iterated when the hooked function is called. Iterating a
+        # tuple is a bit quicker, and it means a one-shot detour removing itself from the list while it's
+        # being run doesn't cause the next detour to be skipped.
+        self._before_chain: tuple[Callable[..., Any], ...] = ()
+        self._after_chain: tuple[Callable[..., Any], ...] = ()
+        # The after detours which take the `_result_` kwarg. These are run after the other after detours.
+        self._after_with_results_chain: tuple[Callable[..., Any], ...] = ()
         self.overload = overload
         self.state = None
         self._name = detour_name
+        # The name and overload are fixed for the lifetime of the hook, so format the full name once.
+        if overload is not None:
+            self._full_name = f"{detour_name}({overload})"
+        else:
+            self._full_name = detour_name
+        self._invalid = False
 
     @property
     def caller_address(self):
-        if self._rsp_addr.value:
+        if self._rsp_addr is not None and self._rsp_addr.value:
             return self._rsp_addr.value - _internal.BASE_ADDRESS
         return 0
 
     @property
-    def name(self):
-        if self.overload is not None:
-            return f"{self._name}({self.overload})"
-        else:
-            return self._name
+    def name(self) -> str:
+        return self._full_name
 
-    def _determine_detour_list(self, detour: HookProtocol) -> Optional[list[Union[HookProtocol, Callable]]]:
+    def _determine_detour_list(
+        self, detour: HookProtocol
+    ) -> Optional[dict[Union[HookProtocol, Callable], None]]:
         # Determine when the hook should be run. Don't add the detour yet
         # because if the hook is a one-shot then we need to know when to run it.
-        detour_list = None
-        if detour._hook_time == DetourTime.BEFORE:
-            detour_list = self._before_detours
-        elif detour._hook_time == DetourTime.AFTER:
-            # Check to see if the detour has the `_result_` argument.
-            # This will have been determined already when the function was
-            # decorated
-            # TODO: Ensure this works if there is some other funky decoration
-            # shenanigans (eg. with a one-shot decorator...)
-            if getattr(detour, "_has__result_", False):
-                detour_list = self._after_detours_with_results
-            else:
-                detour_list = self._after_detours
-        else:
-            logger.error(f"Detour {detour} has an invalid detour time: {detour._hook_time}")
-        return detour_list
-
-    def add_detour(self, detour: HookProtocol):
-        """Add the provided detour to this FuncHook."""
+        # Whether an after detour has the `_result_` argument will have been determined already when the
+        # function was decorated.
+        # NOTE: The detour time is compared by identity since hashing an Enum member calls back into python.
+        flags = _detour_flags(detour)
+        hook_time = flags.get("_hook_time")
+        if hook_time is DetourTime.BEFORE:
+            return self._before_detours
+        elif hook_time is DetourTime.AFTER:
+            if flags.get("_has__result_", False):
+                return self._after_detours_with_results
+            return self._after_detours
+        logger.error(f"Detour {detour} has an invalid detour time: {hook_time}")
+        return None
+
+    def add_detour(self, detour: HookProtocol, update_dispatcher: bool = True):
+        """Add the provided detour to this FuncHook.
+        If adding a number of detours at once, ``update_dispatcher`` can be False for all of them and then
+        :py:meth:`_update_dispatcher` called once at the end.
+        """
+        flags = _detour_flags(detour)
         # If the hook has the `_disabled` attribute, then don't add the detour.
-        if getattr(detour, "_disabled", False):
+        if flags.get("_disabled", False):
             self._disabled_detours.add(detour)
             return
 
-        if getattr(detour, "_noop", False):
+        if flags.get("_noop", False):
             self._has_noop = True
             logger.warning(
                 f"The hook {detour._hook_func_name} has been marked as NOOP. If there are multiple detours "
@@ -168,132 +478,240 @@ class FuncHook(cyminhook.MinHook):
             )
             return
 
-        if not getattr(detour, "_is_one_shot", False):
-            # If we aren't a one-shot detour, then add it to the list.
-            detour_list.append(detour)
-
         # If the hook is a one-shot, wrap it so that it can remove itself once
         # it's executed.
-        if getattr(detour, "_is_one_shot", False):
+        if flags.get("_is_one_shot", False):
 
             def _one_shot(
                 *args,
                 detour: HookProtocol = detour,
-                detour_list: list[Union[HookProtocol, Callable]] = detour_list,
+                detour_list: dict[Union[HookProtocol, Callable], None] = detour_list,
             ):
-                # NOTE: This may not work well if the code is called from multiple threads at the same time.
+                # Remove this wrapper from the detour list *before* calling the detour. This way the detour is
+                # removed irrespective of whether it raises an exception, and if the hooked function is called
+                # by multiple threads at the same time, only the first one to get here will run the detour.
+                if not self._remove_from_detour_list(detour_list, _one_shot):
+                    return
+                # The wrapper is no longer needed, so drop the mapping to it so that it (and the detour) isn't
+                # kept alive by this hook.
+                self._oneshot_detours.pop(detour, None)
+                self._disabled_detours.add(detour)
+                self._update_dispatcher()
                 try:
                     detour(*args)
                 except Exception:
                     logger.exception(
                         f"There was an exception calling the one_shot detour {detour.__qualname__!r} -> "
-                        f"{detour._hook_func_name!r}. It will be disabled anyway, but it may not have been "
-                        "called completely."
+                        f"{detour._hook_func_name!r}. It has been disabled, but it may not have been called "
+                        "completely."
                     )
-                finally:
-                    # Irrespective of whether an exception happens, always try and remove the detour.
-                    # This should only fail if it was called multiple times (ie. if the function is called by
-                    # multiple threads). It should always be removed by the first thread which completes, but
-                    # the other threads will get an exception when removing the detour.
-                    try:
-                        self._disabled_detours.add(detour)
-                        detour_list.remove(self._oneshot_detours[detour])
-                    except ValueError:
-                        logger.warning(
-                            f"Had an issue removing one-shot {detour._hook_func_name} from detour list."
-                        )
 
+            # The wrapper is what is stored in the detour list, so it needs the NOOP flag too so that it is
+            # still known about if another detour is removed before this one is run.
+            if flags.get("_noop", False):
+                _one_shot._noop = True
             self._oneshot_detours[detour] = _one_shot
-            detour_list.append(_one_shot)
+            detour_list[_one_shot] = None
+            self._active_detours.add(_one_shot)
+        else:
+            # If we aren't a one-shot detour, then add it to the list.
+            detour_list[detour] = None
+            self._active_detours.add(detour)
+
+        if update_dispatcher:
+            self._update_dispatcher()
 
         # If the detour needs the `caller_address` property, add it.
-        if getattr(detour, "_get_caller", False) is True:
+        if flags.get("_get_caller", False) is True:
+            self._get_caller = True
             # We need to get the type of the class and assign the attribute to the class function itself.
             setattr(detour.__func__, "caller_address", lambda: self.caller_address)
 
+    def _remove_from_detour_list(
+        self,
+        detour_list: dict[Union[HookProtocol, Callable], None],
+        detour: Union[HookProtocol, Callable],
+    ) -> bool:
+        """Remove the detour from the provided list if it's in it. Returns whether it was removed."""
+        try:
+            # Removing from the set is atomic, so if multiple threads try and remove the same detour only one
+            # of them will succeed.
+            self._active_detours.remove(detour)
+        except KeyError:
+            return False
+        detour_list.pop(detour, None)
+        # Only a before detour can be marked as NOOP, so if one is removed check whether there are any left.
+        if self._has_noop and detour_list is self._before_detours:
+            self._has_noop = any(_detour_flags(d).get("_noop", False) for d in detour_list)
+        return True
+
     def remove_detour(self, detour: HookProtocol):
         """Remove the provided detour from this FuncHook."""
         # Determine the detour list to use. If none, then return.
         if (detour_list := self._determine_detour_list(detour)) is None:
             return
 
-        if detour in detour_list:
-            detour_list.remove(detour)
+        self._remove_from_detour_list(detour_list, detour)
         # Try and remove the hook from the diabled list also in case it's there.
-        if detour in self._disabled_detours:
-            self._disabled_detours.remove(detour)
+        self._disabled_detours.discard(detour)
         # Also check for one-shot detours. They may or may not have been called,
         # but we don't really care.
         # If it has been called then it will be in the disabled detours and so
         # we will have handled it already.
         # If it hasn't then we will look up the mapping now and remove it.
-        if detour in self._oneshot_detours:
-            one_shot_detour = self._oneshot_detours.pop(detour)
-            if one_shot_detour in detour_list:
-                detour_list.remove(one_shot_detour)
+        if (one_shot_detour := self._oneshot_detours.pop(detour, None)) is not None:
+            self._remove_from_detour_list(detour_list, one_shot_detour)
+
+        self._update_dispatcher()
 
         # If we have no more detours remaining, then we disable and close this hook so that we may free it to
         # allow us to correctly re-create it later if need be.
-        if not detour_list:
+        if not self._active_detours:
             self.disable()
             self.close()
 
-        # Check to see if we have any detours marked as NOOP. If not, make sure the flag is set to false.
-        # We can always just check the before detours since only a before detour can be marked as NOOP.
-        self._has_noop == any([getattr(d, "_noop", False) for d in self._before_detours])
-
-    @property
-    def _should_enable(self):
-        return (
-            len(self._before_detours) > 0
-            or len(self._after_detours) > 0
-            or len(self._after_detours_with_results)
-        )
-
     def bind(self) -> bool:
         """Actually initialise the base class. Returns whether the hook is bound."""
-        if not self._should_enable or self._invalid:
+        # There is no point binding the hook if it doesn't have any detours to run.
+        if not self._active_detours or self._invalid:
             return False
 
-        self.detour = self._compound_detour
+        self._entry_namespace = {"dispatcher": self._dispatcher}
+        self.detour = _make_entry(len(self._func_def.argtypes), self._entry_namespace)
 
+        # Only get the ctypes function type once we know the hook is actually going to be bound since it's not
+        # needed for hooks which never get enabled. ctypes caches these types by restype and argtypes, so all
+        # the hooks (and function calls) with the same signature share the one type.
+        signature = CFUNCTYPE(self._func_def.restype, *self._func_def.argtypes)
         try:
-            super().__init__(signature=self.signature, target=self.target)
-        except cyminhook._cyminhook.Error as e:  # type: ignore
-            if e.status == cyminhook._cyminhook.Status.MH_ERROR_ALREADY_CREATED:  # type: ignore
+            super().__init__(signature=signature, target=self.target)
+        except MinHookError as e:
+            if e.status == MinHookStatus.MH_ERROR_ALREADY_CREATED:
                 logger.error("Hook is already created")
             logger.error(f"Failed to initialize hook {self._name} at 0x{self.target:X}")
-            logger.error(e.status.name[3:].replace("_", " ") + f" ({e})")
+            logger.error(f"{_status_label(e.status)} ({e})")
             self.state = "failed"
             return False
         self.state = "initialized"
+        # Now that the original function is available we can select the specialised dispatcher.
+        self._update_dispatcher()
         return True
 
+    def _update_dispatcher(self):
+        """Select the function which is run when the hooked function is called.
+        Most hooks only have detours which run before the original function, or only ones which run after it,
+        and very often just a single detour. For these cases, and for hooks with both, we use a function
+        compiled for the number of arguments of the hooked function which only does the work that particular
+        set of detours needs. If the hook no longer has any detours, the original function is called directly.
+        :py:meth:`_compound_detour` is only used before the hook is bound, or if any of the detours are NOOP's
+        and there are also after detours.
+        This needs to be called any time the detour lists are modified.
+        """
+        original = self.original
+        before_detours = self._before_detours
+        after_detours = self._after_detours
+        after_detours_with_results = self._after_detours_with_results
+        n_before = len(before_detours)
+        n_after = len(after_detours)
+        n_after_with_results = len(after_detours_with_results)
+        self._before_chain = tuple(before_detours)
+        self._after_chain = tuple(after_detours)
+        self._after_with_results_chain = tuple(after_detours_with_results)
+        # The original function only exists once the hook has been bound.
+        has_after = bool(n_after or n_after_with_results)
+        if original is None or (self._has_noop and has_after):
+            self._set_dispatcher(self._compound_detour)
+            return
+        if not (n_before or has_after):
+            # All the detours have been removed (eg. the mods using them have been unloaded), so just call
+            # through to the original function without any extra work.
+            self._set_dispatcher(original)
+            return
+        namespace: dict[str, Any] = {
+            "original": original,
+            "disable_detour": self._disable_failed_detour,
+            "before_detours": before_detours,
+            "after_detours": after_detours,
+            "after_detours_with_results": after_detours_with_results,
+        }
+        # The number of detours unrolled in the dispatcher, if it does so.
+        unrolled = 0
+        if self._has_noop:
+            # NOOP's are always before detours, so there must be some.
+            name = "_noop_before_only"
+            namespace["befores"] = self._before_chain
+        elif n_before and has_after:
+            name = "_before_and_after"
+            namespace["befores"] = self._before_chain
+            namespace["afters"] = self._after_chain
+            namespace["afters_with_results"] = self._after_with_results_chain
+        elif n_before == 1:
+            name = "_single_before"
+            namespace["before"] = self._before_chain[0]
+        elif n_before > 1:
+            if n_before <= _MAX_UNROLLED_BEFORE:
+                name = "_before_unrolled"
+                unrolled = n_before
+                namespace.update((f"before_{i}", func) for i, func in enumerate(self._before_chain))
+            else:
+                name = "_before_only"
+                namespace["befores"] = self._before_chain
+        elif n_after == 1 and n_after_with_results == 0:
+            name = "_single_after"
+            namespace["after"] = next(iter(after_detours))
+        elif n_after == 0 and n_after_with_results == 1:
+            name = "_single_after_with_result"
+            namespace["after_with_result"] = next(iter(after_detours_with_results))
+        else:
+            name = "_after_only"
+            namespace["afters"] = self._after_chain
+            namespace["afters_with_results"] = self._after_with_results_chain
+        self._set_dispatcher(_make_dispatcher(name, len(self._func_def.argtypes), namespace, unrolled))
+
+    def _set_dispatcher(self, dispatcher: Callable[..., Any]):
+        """Set the function which is run when the hooked function is called."""
+        self._dispatcher = dispatcher
+        # Replacing the value in the namespace is a single operation, so any thread calling the hooked
+        # function will either get the old dispatcher or the new one.
+        if (entry_namespace := self._entry_namespace) is not None:
+            entry_namespace["dispatcher"] = dispatcher
+
+    def _disable_failed_detour(self, detour_list: dict, detour: Callable[..., Any]):
+        """Remove a detour which raised an exception so that it isn't called again.
+        This must be called from within the `except` block handling the exception so that it is logged.
+        """
+        logger.exception(f"There was an error with detour {detour}. It has been disabled.")
+        if not self._remove_from_detour_list(detour_list, detour):
+            # Another thread has already removed it.
+            return
+        self._disabled_detours.add(detour)
+        self._update_dispatcher()
+
     def _compound_detour(self, *args):
+        # This is called every time the hooked function is called, so pull everything we need off the instance
+        # once up front so that the loops below only deal with local variables.
+        before_chain = self._before_chain
+        after_chain = self._after_chain
+        after_with_results_chain = self._after_with_results_chain
+        original = self.original
         ret = None
 
         # Loop over the before detours, keeping the last none-None return value.
-        i = None
+        func = None
         try:
-            for i, func in enumerate(self._before_detours):
+            for func in before_chain:
                 r = func(*args)
                 if r is not None:
                     ret = r
-            i = None
         except Exception:
-            if i is not None:
-                bad_detour = self._before_detours.pop(i)
-                logger.error(f"There was an error with detour {bad_detour}. It has been disabled.")
-                logger.error(traceback.format_exc())
-                self._disabled_detours.add(bad_detour)
+            if func is not None:
+                self._disable_failed_detour(self._before_detours, func)
 
         # If we don't have any decorators which NOOP the original function then run as usual.
         if not self._has_noop:
-            # If we get a return value that is not None, then pass it through.
-            if ret is not None:
-                result = self.original(*ret)
-            else:
-                result = self.original(*args)
+            # If we get a return value that is not None, then pass it through instead of the original args.
+            # Otherwise the args tuple we were called with is passed straight through.
+            result = original(*(args if ret is None else ret))
             after_ret = None
         # If we have any NOOP's, then we don't want to run the original, and instead will have the last result
         # returned from our functions as the "result".
@@ -301,27 +719,25 @@ class FuncHook(cyminhook.MinHook):
             result = ret
             after_ret = ret
 
-        # Now loop over the after functions. We'll need to handle the cases of
-        # functions which take the `_result_` kwarg, and those that don't.
-        i = None
-        j = None
+        # Hooks which only have before detours don't need to do anything more.
+        if not after_chain and not after_with_results_chain:
+            return result
+
+        # Now loop over the after functions, and then those which take the `_result_` kwarg.
+        func = None
+        needs_result = False
         try:
-            for i, func in enumerate(self._after_detours):
+            for func in after_chain:
                 after_ret = func(*args)
-            i = None
-            for j, func in enumerate(self._after_detours_with_results):
+            needs_result = True
+            for func in after_with_results_chain:
                 after_ret = func(*args, _result_=result)
-            j = None
         except Exception:
-            bad_detour = None
-            if i is not None:
-                bad_detour = self._after_detours.pop(i)
-            elif j is not None:
-                bad_detour = self._after_detours_with_results.pop(j)
-            if bad_detour is not None:
-                logger.error(f"There was an error with detour {bad_detour}. It has been disabled.")
-                logger.error(traceback.format_exc())
-                self._disabled_detours.add(bad_detour)
+            if func is not None:
+                if needs_result:
+                    self._disable_failed_detour(self._after_detours_with_results, func)
+                else:
+                    self._disable_failed_detour(self._after_detours, func)
 
         if after_ret is not None:
             return after_ret
@@ -329,15 +745,26 @@ class FuncHook(cyminhook.MinHook):
 
     def close(self):
         super().close()
+        # NOTE: `MinHook.__dealloc__` also calls this method. By then the slots have already been cleared, so
+        # there is nothing left to clean up, and setting any of them again would leak whatever was set.
+        if getattr(self, "_active_detours", None) is None:
+            return
         self.state = "closed"
+        # The hooked function will no longer call into this hook, so drop the specialised dispatcher and the
+        # snapshots of the detours so that they don't keep the detours (and so their mods) alive.
+        if self._entry_namespace is not None:
+            self._set_dispatcher(self._compound_detour)
+        self._before_chain = ()
+        self._after_chain = ()
+        self._after_with_results_chain = ()
 
     def queue_enable(self):
-        if self._should_enable:
+        if self._active_detours:
             cyminhook.queue_enable(self)
             self.state = "enabled"
 
     def enable(self):
-        if self._should_enable:
+        if self._active_detours:
             super().enable()
             self.state = "enabled"
 
@@ -378,18 +805,23 @@ class HookFactory:
         setattr(detour, "_has__result_", False)
         setattr(detour, "_noop", False)
         if cls:
-            if hasattr(cls, "_overload"):
-                setattr(detour, "_func_overload", cls._overload)
-            else:
-                setattr(detour, "_func_overload", None)
-            if hasattr(cls, "_name"):
-                setattr(detour, "_hook_func_name", cls._name)
+            # `_overload` always has a default value, but `_name` is only annotated so it may not exist.
+            setattr(detour, "_func_overload", cls._overload)
+            if (name := getattr(cls, "_name", None)) is not None:
+                setattr(detour, "_hook_func_name", name)
         else:
             if detour_name is None:
                 raise ValueError("class used as detour must have a name")
             else:
                 setattr(detour, "_hook_func_name", detour_name)
 
+    @classmethod
+    def _register(cls, detour: Callable[..., Any], detour_time: DetourTime) -> HookProtocol:
+        """Mark the detour as a function hook for this class which runs at the specified time."""
+        HookFactory._set_detour_as_funchook(detour, cls)
+        _set_detour_time(detour, detour_time)
+        return detour
+
     @classmethod
     def after(cls, detour: Callable[..., Any]) -> HookProtocol:
         """
@@ -397,11 +829,7 @@ class HookFactory:
         An optional `_result_` argument can be added as the final argument.
         If this argument is provided it will be the result of calling the original function.
         """
-        HookFactory._set_detour_as_funchook(detour, cls)
-        setattr(detour, "_hook_time", DetourTime.AFTER)
-        if "_result_" in inspect.signature(detour).parameters.keys():
-            setattr(detour, "_has__result_", True)
-        return detour
+        return cls._register(detour, DetourTime.AFTER)
 
     @classmethod
     def before(cls, detour: Callable[..., Any]) -> HookProtocol:
@@ -411,9 +839,7 @@ class HookFactory:
         the function. If this happens these values will be passed into the original function instead of the
         original arguments.
         """
-        HookFactory._set_detour_as_funchook(detour, cls)
-        setattr(detour, "_hook_time", DetourTime.BEFORE)
-        return detour
+        return cls._register(detour, DetourTime.BEFORE)
 
 
 @deprecated(
@@ -459,17 +885,15 @@ def manual_hook(
         #     raise ValueError(f"One of pattern or offset must be set for the manual hook: {detour}")
         HookFactory._set_detour_as_funchook(detour, None, name)
         if detour_time == "before":
-            setattr(detour, "_hook_time", DetourTime.BEFORE)
+            _set_detour_time(detour, DetourTime.BEFORE)
         elif detour_time == "after":
-            setattr(detour, "_hook_time", DetourTime.AFTER)
+            _set_detour_time(detour, DetourTime.AFTER)
         # Set some manual values which can be retrieved when the func hook gets parsed.
         setattr(detour, "_is_manual_hook", True)
         setattr(detour, "_hook_offset", offset)
-        setattr(detour, "_hook_pattern", pattern)
+        setattr(detour, "_hook_pattern", sys.intern(pattern) if pattern is not None else None)
         setattr(detour, "_hook_binary", binary)
         setattr(detour, "_hook_func_def", func_def)
-        if "_result_" in inspect.signature(detour).parameters.keys():
-            setattr(detour, "_has__result_", True)
         return detour
 
     return inner
@@ -524,11 +948,9 @@ def imported(dll_name: str, func_name: str, func_def: FUNCDEF, detour_time: str
         setattr(detour, "_is_imported_func_hook", True)
         setattr(detour, "_hook_func_def", func_def)
         if detour_time == "before":
-            setattr(detour, "_hook_time", DetourTime.BEFORE)
+            _set_detour_time(detour, DetourTime.BEFORE)
         else:
-            setattr(detour, "_hook_time", DetourTime.AFTER)
-            if "_result_" in inspect.signature(detour).parameters.keys():
-                setattr(detour, "_has__result_", True)
+            _set_detour_time(detour, DetourTime.AFTER)
         return detour
 
     return inner
@@ -557,9 +979,9 @@ def exported(func_name: str, func_def: FUNCDEF, detour_time: str = "after"):
         setattr(detour, "_is_exported_func_hook", True)
         setattr(detour, "_hook_func_def", func_def)
         if detour_time == "before":
-            setattr(detour, "_hook_time", DetourTime.BEFORE)
+            _set_detour_time(detour, DetourTime.BEFORE)
         else:
-            setattr(detour, "_hook_time", DetourTime.AFTER)
+            _set_detour_time(detour, DetourTime.AFTER)
         return detour
 
     return inner
@@ -632,16 +1054,26 @@ class HookManager:
         # These hooks will not be instances of classes, but the class type.
         self.failed_hooks: dict[str, Type[FuncHook]] = {}
         # A mapping of the custom event hooks which can be registered by modules
-        # for individual mods.
-        self.custom_callbacks: dict[str, dict[DetourTime, set[CustomTriggerProtocol]]] = {}
+        # for individual mods. Like the detours on a FuncHook, the callbacks are stored as the keys of dicts
+        # so that they are called in the order they were added.
+        self.custom_callbacks: defaultdict[
+            str, defaultdict[DetourTime, dict[CustomTriggerProtocol, None]]
+        ] = defaultdict(lambda: defaultdict(dict))
+        # Snapshots of the above callbacks keyed by the callback key and detour time. These are what are
+        # iterated when the callbacks are called so that only one lookup is needed, and so that a callback can
+        # be removed while they are being called.
+        self._custom_callback_chains: dict[tuple[str, DetourTime], tuple[CustomTriggerProtocol, ...]] = {}
         self._uninitialized_hooks: set[FunctionIdentifier] = set()
         self._hook_id_mapping: dict[HookProtocol, FunctionIdentifier] = {}
-        self._get_caller_detours: set[FunctionIdentifier] = set()
+        # The FuncHook each detour has been added to. This lets us get it directly from the detour without
+        # needing to hash the FunctionIdentifier again.
+        self._detour_funchooks: dict[HookProtocol, FuncHook] = {}
+        # The addresses of the imported functions which have been hooked, keyed by the dll and function name.
+        self._imported_func_offsets: dict[tuple[str, str], int] = {}
 
     def _get_funchook(self, hook: HookProtocol) -> Optional[FuncHook]:
         """Return the associated function hook for the provided hook."""
-        if (hook_id := self._hook_id_mapping.get(hook)) is not None:
-            return self.hooks.get(hook_id)
+        return self._detour_funchooks.get(hook)
 
     def _resolve_dependencies(self):
         """Resolve dependencies of hooks.
@@ -651,32 +1083,39 @@ class HookManager:
         # TODO: Make work.
         pass
 
+    def _update_custom_callback_chain(self, callback_key: str, detour_time: DetourTime):
+        """Update the snapshot of the callbacks for the given key and detour time.
+        This needs to be called any time the callbacks are modified."""
+        if callbacks := self.custom_callbacks.get(callback_key, {}).get(detour_time):
+            self._custom_callback_chains[(callback_key, detour_time)] = tuple(callbacks)
+        else:
+            self._custom_callback_chains.pop((callback_key, detour_time), None)
+
     def _add_custom_callbacks(self, callbacks: set[CustomTriggerProtocol]):
         """Add the provided function to the specified callback type."""
         for cb in callbacks:
             if (cb_type := cb._custom_trigger) is None:
                 continue
-            if cb_type not in self.custom_callbacks:
-                self.custom_callbacks[cb_type] = {}
-            detour_time = getattr(cb, "_hook_time", DetourTime.NONE)
-            if detour_time not in self.custom_callbacks[cb_type]:
-                self.custom_callbacks[cb_type][detour_time] = {
-                    cb,
-                }
-            else:
-                self.custom_callbacks[cb_type][detour_time].add(cb)
+            detour_time = _detour_flags(cb).get("_hook_time", DetourTime.NONE)
+            self.custom_callbacks[cb_type][detour_time][cb] = None
+            self._update_custom_callback_chain(cb_type, detour_time)
 
     def _remove_custom_callbacks(self, callbacks: set[CustomTriggerProtocol]):
         # Remove the values in the list which correspond to the data in `callbacks`
         for cb in callbacks:
             if (cb_type := cb._custom_trigger) is None:
                 continue
-            if cb_type in self.custom_callbacks:
-                # Remove the functions from the set and then check whether it's
-                # empty.
-                self.custom_callbacks[cb_type][getattr(cb, "_hook_time", DetourTime.NONE)].discard(cb)
-                if all(not x for x in self.custom_callbacks[cb_type].values()):
+            if (cb_type_callbacks := self.custom_callbacks.get(cb_type)) is not None:
+                detour_time = _detour_flags(cb).get("_hook_time", DetourTime.NONE)
+                # Remove the function, and then the mappings it was in if they are now empty. This way the
+                # callback key is only left if there are still callbacks for it.
+                if (detour_time_callbacks := cb_type_callbacks.get(detour_time)) is not None:
+                    detour_time_callbacks.pop(cb, None)
+                    if not detour_time_callbacks:
+                        del cb_type_callbacks[detour_time]
+                if not cb_type_callbacks:
                     del self.custom_callbacks[cb_type]
+                self._update_custom_callback_chain(cb_type, detour_time)
 
     def call_custom_callbacks(
         self,
@@ -705,13 +1144,12 @@ class HookManager:
         -----
             If there is no callback registered for the key and detour_time combination nothing will happen.
         """
-        callbacks = self.custom_callbacks.get(callback_key, {})
-        if callbacks:
+        if callbacks := self._custom_callback_chains.get((callback_key, detour_time)):
             if args is None:
                 args = []
             if kwargs is None:
                 kwargs = {}
-            for cb in callbacks.get(detour_time, set()):
+            for cb in callbacks:
                 try:
                     cb(*args, **kwargs)
                 except Exception:
@@ -721,122 +1159,179 @@ class HookManager:
                             cb,
                         }
                     )
-        elif alert_nonexist:
+        elif alert_nonexist and callback_key not in self.custom_callbacks:
             raise ValueError(f"Custom callback {callback_key} cannot be found.")
 
+    def _resolve_patterns_batch(self, hooks: Iterable[HookProtocol]):
+        """Find the patterns for all the provided hooks in a single pass over the binary.
+        The offsets are cached so that when each hook is registered, finding its pattern is just a lookup.
+        """
+        patterns = set()
+        for hook in hooks:
+            flags = _detour_flags(hook)
+            if flags.get("_disabled", False) or flags.get("_hook_offset") is not None:
+                continue
+            if (hook_pattern := flags.get("_hook_pattern")) is not None:
+                patterns.add(hook_pattern)
+        if patterns:
+            # Hooks are always on functions, so only the executable code needs searching. Any pattern not
+            # found will still be searched for in the whole binary when the hook is registered.
+            find_patterns_in_binary(patterns, _internal.EXE_NAME, executable_only=True)
+
     def try_remove_hook(self, hook: HookProtocol):
-        """Remove the provided hook from the internal store only if it's already closed."""
-        if (hook_id := self._hook_id_mapping.get(hook)) is not None:
-            if (func_hook := self.hooks.get(hook_id)) is not None:
-                if func_hook.state == "closed":
-                    del self.hooks[hook_id]
+        """Remove the provided hook from the internal store only if it's already closed.
+        The hook is expected to have already been removed from its FuncHook, so the references to it are
+        always dropped.
+        """
+        func_hook = self._detour_funchooks.pop(hook, None)
+        if (hook_id := self._hook_id_mapping.pop(hook, None)) is not None:
+            if func_hook is not None and func_hook.state == "closed":
+                self.hooks.pop(hook_id, None)
+                # The hook may have been removed before it was ever initialized.
+                self._uninitialized_hooks.discard(hook_id)
 
     def register_hook(self, hook: HookProtocol):
         """Register the provided hook.
         This will determine the offset of the function being hooked."""
-        if getattr(hook, "_disabled", False) is True:
-            # Do nothing, exit immediately.
-            return
-        hook_func_name = hook._hook_func_name
-        # If the hook has an overload, add it here so that we can disambiguate them.
-        if getattr(hook, "_func_overload", None) is not None:
-            hook_func_name += f"({hook._func_overload})"
+        if (func_hook := self._register_hook(hook)) is not None:
+            func_hook._update_dispatcher()
 
-        # First, try and look up some info about the hook.
+    def register_hooks(self, hooks: Iterable[HookProtocol]):
+        """Register all the provided hooks.
+        The patterns for all the hooks are found in a single pass over the binary, and each function hook only
+        updates its dispatcher once, after all its detours have been added.
+        """
+        hooks = tuple(hooks)
+        self._resolve_patterns_batch(hooks)
+        # The function hooks are stored as the keys of a dict so that each is only updated once, in the order
+        # they were first registered.
+        func_hooks: dict[FuncHook, None] = {}
+        for hook in hooks:
+            if (func_hook := self._register_hook(hook)) is not None:
+                func_hooks[func_hook] = None
+        for func_hook in func_hooks:
+            func_hook._update_dispatcher()
+
+    def _get_function_identifier(
+        self, hook: HookProtocol, hook_func_name: str
+    ) -> Optional[FunctionIdentifier]:
+        """Determine the location of the function the hook is for.
+        The hook's offset, pattern, imported function and exported function are checked in that order and the
+        first one which is set is used."""
         # We can't trust the name of the hook as this may not be correct or mean anything.
         # The only thing we can trust is a relative offset within a particular binary.
-
         hook_binary = _internal.EXE_NAME
-        hook_offset = None
-        hook_offset_is_absolute = False
 
-        # First, if we have an offset then look it up.
-        if hook._hook_offset is not None:
-            hook_offset = hook._hook_offset
+        # First, if we have an offset then use it directly.
+        if (hook_offset := hook._hook_offset) is not None:
+            return FunctionIdentifier(hook_func_name, hook_offset, hook_binary, False)
         # Otherwise, try lookup the pattern if we have one.
-        elif (hook_pattern := hook._hook_pattern) is not None:
-            hook_offset = find_pattern_in_binary(hook_pattern, False, hook_binary)
+        if (hook_pattern := hook._hook_pattern) is not None:
+            if (hook_offset := find_pattern_in_binary(hook_pattern, False, hook_binary)) is not None:
+                return FunctionIdentifier(hook_func_name, hook_offset, hook_binary, False)
         elif hook._is_imported_func_hook and hook._dll_name:
-            hook_binary = hook._dll_name.lower()
-            if (dll_func_ptrs := _internal.imports.get(hook_binary)) is not None:
-                if func_ptr := dll_func_ptrs.get(hook_func_name):
-                    # For now, cast the func_ptr object back to the target location in memory.
-                    # This is wasteful, but simple for now for testing...
-                    hook_offset = ctypes.cast(func_ptr, ctypes.c_void_p).value
-                    hook_offset_is_absolute = True
-            else:
+            # This is used as the binary of the FunctionIdentifier and so is hashed and compared with those of
+            # all the other hooks. Interning it means every hook for the same dll shares the one string.
+            hook_binary = sys.intern(hook._dll_name.lower())
+            if (hook_offset := self._imported_func_offsets.get((hook_binary, hook_func_name))) is not None:
+                return FunctionIdentifier(hook_func_name, hook_offset, hook_binary, True)
+            if (dll_func_ptrs := _internal.imports.get(hook_binary)) is None:
                 logger.error(f"Cannot find {hook_binary} in the import list")
-                return
+                return None
+            if func_ptr := dll_func_ptrs.get(hook_func_name):
+                # Cast the func_ptr object back to the target location in memory.
+                hook_offset = ctypes.cast(func_ptr, ctypes.c_void_p).value
+                self._imported_func_offsets[(hook_binary, hook_func_name)] = hook_offset
+                return FunctionIdentifier(hook_func_name, hook_offset, hook_binary, True)
         elif hook._is_exported_func_hook:
             if _internal.BINARY_PATH is None:
                 logger.error("Current running binary path unknown. Cannot hook exported functions")
-                return
-            # TODO: This is inefficient. We should only instantiate the "dll" once.
-            own_dll = ctypes.WinDLL(_internal.BINARY_PATH)
-            func_ptr = getattr(own_dll, hook._hook_func_name)
+                return None
+            func_ptr = getattr(get_own_dll(), hook._hook_func_name)
             hook_offset = ctypes.cast(func_ptr, ctypes.c_void_p).value
-            hook_offset_is_absolute = True
+            return FunctionIdentifier(hook_func_name, hook_offset, hook_binary, True)
 
-        if hook_offset is not None:
-            func_id = FunctionIdentifier(hook_func_name, hook_offset, hook_binary, hook_offset_is_absolute)
-        else:
-            logger.error(f"Unable to find offset for {hook_func_name}. Hook will not be registered.")
-            return
+        logger.error(f"Unable to find offset for {hook_func_name}. Hook will not be registered.")
+        return None
 
-        if func_id not in self.hooks:
+    def _register_hook(self, hook: HookProtocol) -> Optional[FuncHook]:
+        """Register the provided hook and return the FuncHook it was added to.
+        The dispatcher of the returned FuncHook still needs to be updated."""
+        flags = _detour_flags(hook)
+        if flags.get("_disabled", False) is True:
+            # Do nothing, exit immediately.
+            return None
+        hook_func_name = hook._hook_func_name
+        # If the hook has an overload, add it here so that we can disambiguate them.
+        if (func_overload := flags.get("_func_overload")) is not None:
+            hook_func_name += f"({func_overload})"
+
+        if (func_id := self._get_function_identifier(hook, hook_func_name)) is None:
+            return None
+
+        # NOTE: FunctionIdentifier has a python-level __hash__ and __eq__, so only look it up once.
+        if (func_hook := self.hooks.get(func_id)) is None:
             try:
-                self.hooks[func_id] = FuncHook(
+                func_hook = FuncHook(
                     func_id.name,
                     offset=func_id.offset,
                     func_def=hook._hook_func_def,
-                    binary=hook_binary,
+                    binary=func_id.binary,
                     offset_is_absolute=func_id.is_absolute,
                 )
             except Exception:
                 logger.exception(f"There was an issue creating the func hook for {func_id}")
-                return
+                return None
+            self.hooks[func_id] = func_hook
             self._uninitialized_hooks.add(func_id)
-            self._hook_id_mapping[hook] = func_id
-        self.hooks[func_id].add_detour(hook)
-
-        if getattr(hook, "_get_caller", False):
-            self._get_caller_detours.add(func_id)
+        self._hook_id_mapping[hook] = func_id
+        self._detour_funchooks[hook] = func_hook
+        func_hook.add_detour(hook, update_dispatcher=False)
+        return func_hook
 
     def initialize_hooks(self) -> int:
         """Initialize any uninitialized hooks.
         This will also enable the hooks so that they become active.
         """
         count = 0
-        for hook_func_id in self._uninitialized_hooks:
+        # Take the current set of hooks to initialize and start a new one so that if anything goes wrong part
+        # way through, the hooks we have already handled won't be bound a second time on the next call.
+        # They are handled in order of where they are in memory so that the order is deterministic and memory
+        # near each hooked function is visited in order.
+        pending_hooks = sorted(
+            self._uninitialized_hooks, key=lambda func_id: (func_id.binary, func_id.offset)
+        )
+        self._uninitialized_hooks = set()
+        bound_hooks: list[tuple[FunctionIdentifier, FuncHook]] = []
+        for hook_func_id in pending_hooks:
             hook = self.hooks[hook_func_id]
-            bound = hook.bind()
-            if bound:
-                count += 1
-            else:
-                # If the mod didn't get bound, we don't try and enable it!
+            if not hook.bind():
+                # If the hook didn't get bound, we don't try and enable it!
                 continue
+            count += 1
+            bound_hooks.append((hook_func_id, hook))
             # Try and enable the hook.
             try:
                 hook.queue_enable()
-                if hook._offset_is_absolute:
-                    offset = hook.target
-                    prefix = ""
-                else:
-                    offset = hook.offset
-                    prefix = f"{hook._binary}+"
-                logger.debug(f"Enabled hook for {hook_func_id.name} at {prefix}0x{offset:X}")
+                # Working out the address to show is only needed for the debug message.
+                if logger.isEnabledFor(logging.DEBUG):
+                    if hook._offset_is_absolute:
+                        offset = hook.target
+                        prefix = ""
+                    else:
+                        offset = hook.offset
+                        prefix = f"{hook._binary}+"
+                    logger.debug("Enabled hook for %s at %s0x%X", hook_func_id.name, prefix, offset)
             except Exception:
-                logger.error(f"Unable to enable {hook_func_id.name} because:")
-                logger.error(traceback.format_exc())
+                logger.exception(f"Unable to enable {hook_func_id.name}")
 
         # Now, bulk enable all hooks.
         cyminhook.apply_queued()
 
-        for hook_func_id in self._uninitialized_hooks:
+        for hook_func_id, hook in bound_hooks:
             # If any of the hooked functions want to log where they were called from, we need to overwrite
             # part of the trampoline bytes to capture the RSP register.
-            if hook_func_id in self._get_caller_detours:
-                hook = self.hooks[hook_func_id]
+            if hook._get_caller:
                 if not HAS_ICED:
                     logger.error(
                         f"Cannot get calling address of {hook_func_id.name} as `iced_x86` package is not "
@@ -852,50 +1347,46 @@ class HookManager:
                     # If we ever need more we'll need to make our own little detour somewhere else.
                     data_at_detour = (ctypes.c_char * 0x20).from_address(jmp_addr)
 
+                    # Depending on the bitness, create the variable to hold the return address.
+                    if BITS == 64:
+                        hook._rsp_addr = ctypes.c_ulonglong(0)
+                    else:
+                        hook._rsp_addr = ctypes.c_ulong(0)
                     rsp_buff_addr = get_addressof(hook._rsp_addr)
 
                     rsp_load_bytes = generate_load_stack_pointer_bytes(rsp_buff_addr, jmp_addr, BITS)
-                    # Get the original bytes written by minhook so that we can restore them.
-                    len_rsp_load_bytes = len(rsp_load_bytes)
-                    orig_bytes = data_at_detour.raw[:0xE]
-                    for i in range(len_rsp_load_bytes):
-                        data_at_detour[i] = rsp_load_bytes[i]
-                    for j in range(len(orig_bytes)):
-                        data_at_detour[len_rsp_load_bytes + j] = orig_bytes[j]
+                    # Get the original bytes written by minhook so that we can restore them after our bytes.
+                    new_bytes = rsp_load_bytes + data_at_detour.raw[:0xE]
+                    # Write all the bytes in one go. Assigning to a slice of the array (rather than using
+                    # memmove) means this will still fail rather than write past the end of the trampoline.
+                    data_at_detour[: len(new_bytes)] = new_bytes
                     logger.info(
                         f"The function {hook_func_id.name} has a modified hook to get the calling address."
                     )
 
-        # There are no uninitialized hooks.
-        self._uninitialized_hooks = set()
         return count
 
-    def _debug_show_states(self):
-        # Return the states of all the registered hooks
+    def _iter_state_lines(self):
+        """Yield the lines describing the state of all the registered hooks."""
         for hook_func_id, hook in self.hooks.items():
-            logger.info(f"Functions registered for {hook_func_id.name}:")
-            if hook._before_detours:
-                logger.info("  Before Detours:")
-                for func in hook._before_detours:
-                    logger.info(f"    {func}")
-            if hook._after_detours:
-                logger.info("  After Detours:")
-                for func in hook._after_detours:
-                    logger.info(f"    {func}")
+            yield f"Functions registered for {hook_func_id.name} ({hook.state}):"
+            for title, detours in (
+                ("Before Detours", hook._before_detours),
+                ("After Detours", hook._after_detours),
+                ("After Detours (with result)", hook._after_detours_with_results),
+            ):
+                if detours:
+                    yield f"  {title}:"
+                    yield from (f"    {func}" for func in detours)
+
+    def _debug_show_states(self):
+        # Log the states of all the registered hooks as a single message.
+        logger.info("\n".join(self._iter_state_lines()))
 
 
 class Structure(ctypes.Structure):
     """Simple wrapper around ctypes.Structure."""
 
-    def __getattribute__(self, name: str):
-        # Hook the instance attribute lookup so that we may "bind" the instance to the returned FunctionHook
-        # instance.
-        # We need to do this because the decorator has no knowledge of the actual bound instance at run-time.
-        res = super().__getattribute__(name)
-        if isinstance(res, FunctionHook):
-            res._bound_class = self
-        return res
-
     @classmethod
     def new_empty(cls) -> Self:
         """Create a new empty instance of the structure. This will have ALL of its data as empty bytes.
@@ -923,6 +1414,21 @@ THIS = TypeVar(
 
 
 class FunctionHook(Generic[P, R]):
+    __slots__ = (
+        "_func",
+        "_signature",
+        "_offset",
+        "_exported_name",
+        "_imported_name",
+        "_overload_id",
+        "_is_static",
+        "_this_is_pointer",
+        "_this_getter",
+        "_bound_class",
+        "_funcdef",
+        "_cfunc",
+    )
+
     def __init__(
         self,
         func: Union[Callable[P, R], Callable[Concatenate[S, THIS, P], R]],
@@ -934,15 +1440,21 @@ class FunctionHook(Generic[P, R]):
         is_static: bool = False,
     ):
         self._func = func
-        self._signature = signature
+        # The pattern is used as the key to look up the offset in the offset cache. Interning it means that
+        # the lookup will find the key by identity rather than having to compare the strings.
+        self._signature = sys.intern(signature) if signature is not None else None
         self._offset = offset
         self._exported_name = exported_name
         self._imported_name = imported_name
         self._overload_id = overload_id
         self._is_static = is_static
         self._this_is_pointer: Optional[bool] = None
+        # The function used to convert the bound instance into the `this` argument. Determined on first call.
+        self._this_getter: Optional[Callable[[ctypes.Structure], Any]] = None
         self._bound_class: Optional[ctypes.Structure] = None
         self._funcdef: Optional[FuncDef] = None
+        # The ctypes function pointer to the function in memory. Resolved on the first call.
+        self._cfunc: Optional[Callable[..., Any]] = None
 
     @property
     def this_is_pointer(self):
@@ -957,6 +1469,16 @@ class FunctionHook(Generic[P, R]):
         )
         return self._this_is_pointer
 
+    def __get__(self, instance: Optional[ctypes.Structure], owner: Optional[type] = None) -> Self:
+        # "Bind" the instance the FunctionHook is accessed from so that it can be passed as the `this`
+        # argument when called. We need to do this because the decorator has no knowledge of the actual bound
+        # instance at run-time.
+        # This is only done when the FunctionHook itself is accessed so that accessing any other attributes of
+        # the instance (eg. the fields of a Structure) isn't slowed down.
+        if instance is not None:
+            self._bound_class = instance
+        return self
+
     def _call(self, *args, **kwargs) -> Optional[R]:
         """Call the actual function. This will do some work to find where the function is in memory and then
         call it with the provided arguments.
@@ -972,23 +1494,27 @@ class FunctionHook(Generic[P, R]):
             # better to just flatten the kwargs and args into a single set of args and pass into the function
             # prototype defined by an offset.
             _args = self._funcdef.flatten(*args, **kwargs)
-            sig = CFUNCTYPE(self._funcdef.restype, *self._funcdef.arg_types)
-            binary_base = _internal.BASE_ADDRESS
-            # Depending on what kind of function we are calling, we change how we find the offset of the func.
-            offset = None
-            if self._offset is not None:
-                offset = binary_base + self._offset
-            elif self._signature is not None:
-                rel_offset = find_pattern_in_binary(self._signature, False, _internal.EXE_NAME)
-                if rel_offset is not None and isinstance(rel_offset, int):
-                    offset = binary_base + rel_offset
-            elif self._exported_name is not None:
-                own_dll = ctypes.WinDLL(_internal.BINARY_PATH)
-                func_ptr = getattr(own_dll, self._exported_name)
-                offset = ctypes.cast(func_ptr, ctypes.c_void_p).value
+            # The location of the function doesn't change, so once we have created the function pointer, keep
+            # it so that subsequent calls can use it directly.
+            if (cfunc := self._cfunc) is None:
+                binary_base = _internal.BASE_ADDRESS
+                # Depending on what kind of function we are calling, we change how we find the offset of the
+                # func.
+                offset = None
+                if self._offset is not None:
+                    offset = binary_base + self._offset
+                elif self._signature is not None:
+                    rel_offset = find_pattern_in_binary(self._signature, False, _internal.EXE_NAME)
+                    if rel_offset is not None and isinstance(rel_offset, int):
+                        offset = binary_base + rel_offset
+                elif self._exported_name is not None:
+                    func_ptr = getattr(get_own_dll(), self._exported_name)
+                    offset = ctypes.cast(func_ptr, ctypes.c_void_p).value
+                if offset is not None:
+                    sig = CFUNCTYPE(self._funcdef.restype, *self._funcdef.arg_types)
+                    cfunc = self._cfunc = sig(offset)
             # Finally, call the function.
-            if offset is not None:
-                cfunc = sig(offset)
+            if cfunc is not None:
                 try:
                     val = cfunc(*_args)
                 except ctypes.ArgumentError:
@@ -1000,6 +1526,7 @@ class FunctionHook(Generic[P, R]):
                 except OSError:
                     logger.exception(f"There was an exception calling {self._func.__qualname__!r}")
                     arg_types = [type(x) for x in _args]
+                    offset = ctypes.cast(cfunc, ctypes.c_void_p).value or 0
                     logger.error(
                         "Function details:\n"
                         f"Function Signature: {self._funcdef.arg_types}\n"
@@ -1018,7 +1545,9 @@ class FunctionHook(Generic[P, R]):
         # This initial check is to check if the first argument was a function.
         # This will only happen if the function is being used as a decorator.
         # if this check fails, then we are calling the function under "normal" usage.
-        if args and inspect.isfunction(args[0]):
+        # `inspect.isfunction` is just this isinstance check, but calling it directly avoids an extra Python
+        # function call every time the function is called.
+        if args and isinstance(args[0], FunctionType):
             # In this case the decorator was used without a .before or .after -> raise error
             raise ValueError(
                 f"Hook for detour {self._func.__qualname__!r} must be specified as either `before` or `after`"
@@ -1033,11 +1562,14 @@ class FunctionHook(Generic[P, R]):
             # bound to, and then get the address of it and pass it in as the first argument.
             if self._bound_class is not None:
                 try:
-                    if self.this_is_pointer:
-                        return self._call(ctypes.byref(self._bound_class), *args, **kwargs)
-                    else:
-                        # If it's not a pointer, then we'll assume it's an int and pass the address...
-                        return self._call(ctypes.addressof(self._bound_class), *args, **kwargs)
+                    if (this_getter := self._this_getter) is None:
+                        if self.this_is_pointer:
+                            this_getter = ctypes.byref
+                        else:
+                            # If it's not a pointer, then we'll assume it's an int and pass the address...
+                            this_getter = ctypes.addressof
+                        self._this_getter = this_getter
+                    return self._call(this_getter(self._bound_class), *args, **kwargs)
                 except Exception:
                     logger.exception(f"Failed to call {self._func.__qualname__} with args {args}")
             else:
@@ -1049,10 +1581,12 @@ class FunctionHook(Generic[P, R]):
                 f"Hook for detour {detour.__qualname__!r} must be specified as either `before` or `after`"
             )
 
-        self._funcdef = _get_funcdef(self._func)
+        # Every detour for this function shares the same FuncDef, so only look it up the first time.
+        if self._funcdef is None:
+            self._funcdef = _get_funcdef(self._func)
 
         setattr(detour, "_is_funchook", True)
-        setattr(detour, "_hook_time", hook_time)
+        _set_detour_time(detour, hook_time)
         if self._exported_name is None:
             setattr(detour, "_hook_func_name", self._func.__qualname__)
         else:
@@ -1076,7 +1610,6 @@ class FunctionHook(Generic[P, R]):
         setattr(detour, "_hook_pattern", self._signature)
         setattr(detour, "_is_manual_hook", False)
         setattr(detour, "_is_exported_func_hook", self._exported_name is not None)
-        setattr(detour, "_has__result_", False)
         setattr(detour, "_noop", False)
         setattr(detour, "_func_overload", self._overload_id)
         return detour
@@ -1084,8 +1617,6 @@ class FunctionHook(Generic[P, R]):
     def after(self, detour: Callable) -> HookProtocol:
         """Mark the detour as running after the original function."""
         decorated_detour = self._decorate_detour(detour, DetourTime.AFTER)
-        if "_result_" in inspect.signature(detour).parameters.keys():
-            setattr(detour, "_has__result_", True)
         return decorated_detour
 
     def before(self, detour: Callable) -> HookProtocol:
@@ -1099,14 +1630,15 @@ class FunctionHook(Generic[P, R]):
         if overload_id == self._overload_id:
             return self
         else:
-            fh = _FunctionHook_overloads.get(self._func.__qualname__, {}).get(overload_id, None)
-            if fh is not None:
-                return fh
-            else:
-                raise ValueError(f"Unknown overload {overload_id!r} for {self._func.__qualname__}")
+            if (overloads := _FunctionHook_overloads.get(self._func.__qualname__)) is not None:
+                if (fh := overloads.get(overload_id)) is not None:
+                    return fh
+            raise ValueError(f"Unknown overload {overload_id!r} for {self._func.__qualname__}")
 
 
 class _function_hook:
+    __slots__ = ("signature", "offset", "exported_name", "imported_name", "overload_id")
+
     def __init__(
         self,
         signature: Optional[str] = None,
@@ -1155,6 +1687,8 @@ class static_function_hook(_function_hook):
         calling and hooking purposes.
     """
 
+    __slots__ = ()
+
     def __call__(self, func: Callable[P, R]) -> FunctionHook[P, R]:
         if not self.signature and not self.offset and not self.exported_name and not self.imported_name:
             raise ValueError(
@@ -1217,6 +1751,8 @@ class function_hook(_function_hook):
         calling and hooking purposes.
     """
 
+    __slots__ = ()
+
     def __call__(self, func: Callable[Concatenate[S, THIS, P], R]) -> FunctionHook[P, R]:
         if not self.signature and not self.offset and not self.exported_name and not self.imported_name:
             raise ValueError(
@@ -1235,7 +1771,7 @@ class function_hook(_function_hook):
             self.overload_id,
             is_static=False,
         )
-        _FunctionHook_overloads[func.__qualname__][self.overload_id] = fh
+        _FunctionHook_overloads.setdefault(func.__qualname__, {})[self.overload_id] = fh
         return fh
 
 
@@ -1,19 +1,34 @@
 import ctypes
 import logging
+import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from functools import lru_cache, partial
 from gc import get_referents
 from types import FunctionType, ModuleType
-from typing import Literal, Optional, Sequence, Type, TypeVar, Union, overload
+from typing import Iterable, Literal, NamedTuple, Optional, Sequence, Type, TypeVar, Union, overload
 
 import pymem
+import pymem.memory
 import pymem.pattern
-from pymem.ressources.structure import MODULEINFO
+import regex
+from pymem.ressources.structure import MEMORY_PROTECTION, MEMORY_STATE, MODULEINFO
 
 import pymhf.core._internal as _internal
 import pymhf.core.caching as cache
+from pymhf.core.hashing import _get_sections, _get_sections_info
 from pymhf.extensions.ctypes import CTYPES
+from pymhf.utils.winapi import IMAGE_SCN_MEM_EXECUTE
 
-__all__ = ["getsize", "get_addressof", "map_struct", "find_pattern_in_binary"]
+__all__ = [
+    "getsize",
+    "get_addressof",
+    "map_struct",
+    "find_pattern_in_binary",
+    "find_patterns_in_binary",
+    "get_executable_ranges",
+]
 
 # Custom objects know their class.
 # Function objects seem to know way too much, including modules.
@@ -26,6 +41,15 @@ logger = logging.getLogger(__name__)
 MEM_ACCESS_R = 0x100  # Read only.
 MEM_ACCESS_RW = 0x200  # Read and Write access.
 
+# The memory protections which we are allowed to read when scanning for patterns.
+SCANNABLE_PROTECTIONS = {
+    MEMORY_PROTECTION.PAGE_EXECUTE,
+    MEMORY_PROTECTION.PAGE_EXECUTE_READ,
+    MEMORY_PROTECTION.PAGE_EXECUTE_READWRITE,
+    MEMORY_PROTECTION.PAGE_READWRITE,
+    MEMORY_PROTECTION.PAGE_READONLY,
+}
+
 
 ctypes.pythonapi.PyMemoryView_FromMemory.argtypes = (
     ctypes.c_char_p,
@@ -234,6 +258,145 @@ def pattern_to_bytes(patt: str) -> bytes:
     return b"".join([f"\\x{x}".encode() if (x != "??" and x != "?") else b"." for x in split])
 
 
+def _strip_leading_wildcards(patt: str) -> tuple[str, int]:
+    """Remove any wildcards from the start of the pattern.
+    A pattern which starts with a wildcard can match at any byte, meaning that the regex engine has to try
+    every position in the binary. Starting with a literal byte lets it skip straight to the candidates.
+    Returns the trimmed pattern and the number of bytes which were removed from the start so that the offset
+    of any match can be corrected.
+    """
+    split = patt.split(" ")
+    count = 0
+    for x in split:
+        if x != "??" and x != "?":
+            break
+        count += 1
+    if count == len(split):
+        # A pattern of only wildcards can't be improved, so leave it as is.
+        return patt, 0
+    return " ".join(split[count:]), count
+
+
+class _ParsedPattern(NamedTuple):
+    # The compiled regex for the pattern with any leading wildcards removed.
+    regex: "regex.Pattern[bytes]"
+    # The number of leading wildcards which were removed.
+    lead: int
+    # The longest run of fixed bytes in the pattern. If these bytes don't appear in a block of memory then the
+    # pattern can't either.
+    anchor: bytes
+    # The position of the anchor within the pattern (after the leading wildcards have been removed).
+    anchor_offset: int
+
+
+@lru_cache(maxsize=None)
+def _parse_pattern(patt: str) -> _ParsedPattern:
+    """Convert the pattern into the form used to search for it in memory.
+    This is cached so that a pattern which is searched for more than once, or in more than one binary, is only
+    parsed and compiled the first time.
+    """
+    trimmed_pattern, lead = _strip_leading_wildcards(patt)
+    anchor = b""
+    anchor_offset = 0
+    run: list[str] = []
+    for i, x in enumerate(trimmed_pattern.split(" ") + ["?"]):
+        if x != "??" and x != "?":
+            run.append(x)
+        else:
+            if len(run) > len(anchor):
+                anchor = bytes.fromhex("".join(run))
+                anchor_offset = i - len(run)
+            run = []
+    return _ParsedPattern(
+        regex.compile(pattern_to_bytes(trimmed_pattern), regex.DOTALL),
+        lead,
+        anchor,
+        anchor_offset,
+    )
+
+
+# Anchors shorter than this are too common to be worth searching for on their own.
+_MIN_ANCHOR_LENGTH = 4
+
+
+@lru_cache(maxsize=None)
+def _compile_anchor(anchor: bytes) -> "regex.Pattern[bytes]":
+    return regex.compile(regex.escape(anchor))
+
+
+def _search_anchored_patterns(
+    page_bytes: bytes,
+    anchor: bytes,
+    anchored_patterns: dict[str, _ParsedPattern],
+) -> list[tuple[str, int]]:
+    """Search the block of memory for the patterns which share the provided anchor.
+    Returns the pattern and the offset within the block for each pattern which is found.
+    """
+    # All the searches use `concurrent=True` so that `regex` releases the GIL while searching, letting other
+    # groups be searched at the same time.
+    found = []
+    if len(anchor) < _MIN_ANCHOR_LENGTH:
+        # Patterns which are entirely wildcards have no anchor to search for, and a short anchor will occur so
+        # often that checking the full pattern at each occurrence is slower than just running the regex.
+        for pattern, parsed_pattern in anchored_patterns.items():
+            match = parsed_pattern.regex.search(page_bytes, parsed_pattern.lead, concurrent=True)
+            if match is not None:
+                found.append((pattern, match.start() - parsed_pattern.lead))
+        return found
+    # Searching for a literal string of bytes is much quicker than searching for a pattern with wildcards, so
+    # find where the anchor is and only check whether the full pattern matches at those places. Since these
+    # are found in order, the first match for each pattern is the same as searching the block with the regex
+    # would give.
+    anchor_regex = _compile_anchor(anchor)
+    unmatched = dict(anchored_patterns)
+    anchor_match = anchor_regex.search(page_bytes, 0, concurrent=True)
+    while anchor_match is not None:
+        anchor_pos = anchor_match.start()
+        for pattern, parsed_pattern in tuple(unmatched.items()):
+            start = anchor_pos - parsed_pattern.anchor_offset
+            # The leading wildcards which were stripped from the pattern still need to fit in the block.
+            if start >= parsed_pattern.lead and parsed_pattern.regex.match(page_bytes, start) is not None:
+                found.append((pattern, start - parsed_pattern.lead))
+                del unmatched[pattern]
+        if not unmatched:
+            break
+        # Search from the next byte rather than the end of this match since the anchor may overlap itself.
+        anchor_match = anchor_regex.search(page_bytes, anchor_pos + 1, concurrent=True)
+    return found
+
+
+def get_executable_ranges(binary: Optional[str] = None) -> list[tuple[int, int]]:
+    """Get the ranges of the binary which contain executable code.
+    This reads the section table from the PE headers of the binary as loaded in memory.
+
+    Parameters
+    ----------
+    binary:
+        The binary to get the ranges for. If not provided this will be the main binary.
+
+    Returns
+    -------
+    A list of (start, size) tuples for each executable section, where start is relative to the start of the
+    binary. If the headers can't be read this will be empty.
+    """
+    if binary is None:
+        binary = _internal.EXE_NAME
+    if not (hm := _get_binary_info(binary)):
+        return []
+    handle, module = hm
+    try:
+        sections_base, num_sections = _get_sections_info(handle, module.lpBaseOfDll)
+        sections = _get_sections(handle, sections_base, num_sections, module.SizeOfImage)
+    except Exception:
+        logger.exception(f"Unable to read the section headers for {binary}")
+        return []
+    return [
+        (virtual_addr, size)
+        for virtual_addr, size, _, characteristics in sections
+        if characteristics & IMAGE_SCN_MEM_EXECUTE
+    ]
+
+
 def _get_binary_info(binary: str) -> Optional[tuple[int, MODULEINFO]]:
     if binary not in cache.hm_cache:
         try:
@@ -277,8 +440,10 @@ def find_pattern_in_binary(
     """
     if (_cached_offset := cache.offset_cache.get(pattern, binary)) is not None:
         logger.debug(
-            f"Using cached offset 0x{_cached_offset:X} for pattern {pattern}"
-            f" and binary {binary or _internal.EXE_NAME}"
+            "Using cached offset 0x%X for pattern %s and binary %s",
+            _cached_offset,
+            pattern,
+            binary or _internal.EXE_NAME,
         )
         return _cached_offset
     if binary is None:
@@ -287,17 +452,124 @@ def find_pattern_in_binary(
     if not hm:
         return None
     handle, module = hm
-    patt = pattern_to_bytes(pattern)
-    _offset = pymem.pattern.pattern_scan_module(handle, module, patt, return_multiple=return_multiple)
+    parsed_pattern = _parse_pattern(pattern)
+    lead = parsed_pattern.lead
+    _offset = pymem.pattern.pattern_scan_module(
+        handle, module, parsed_pattern.regex.pattern, return_multiple=return_multiple
+    )
     if _offset:
         if return_multiple:
             logger.error("Getting multiple offsets not currently supported. Falling back to first value.")
             _offset = _offset[0]
-        _offset = _offset - module.lpBaseOfDll
+        _offset = _offset - lead - module.lpBaseOfDll
+        if _offset < 0:
+            # The match was too close to the start of the binary for the leading wildcards which were stripped
+            # to fit before it, so search again with the full pattern.
+            _offset = pymem.pattern.pattern_scan_module(handle, module, pattern_to_bytes(pattern))
+            if not _offset:
+                return None
+            _offset = _offset - module.lpBaseOfDll
     else:
         return None
     # Cache even if there is no result (so we don't repeatedly look for it when it's not there in case there
     # is an issue.)
-    logger.debug(f"Found {pattern} at 0x{_offset:X} for binary {binary}")
+    logger.debug("Found %s at 0x%X for binary %s", pattern, _offset, binary)
     cache.offset_cache.set(pattern, _offset, binary, True)
     return _offset
+
+
+def find_patterns_in_binary(
+    patterns: Iterable[str],
+    binary: Optional[str] = None,
+    executable_only: bool = False,
+) -> dict[str, Optional[int]]:
+    """Find a number of patterns in the specified binary at once.
+    Unlike :py:func:`find_pattern_in_binary`, this reads each region of memory in the binary only once and
+    searches for every pattern which hasn't been found yet within it, so the cost of walking over the binary
+    is only paid once however many patterns there are.
+    Any offsets found are added to the offset cache so that subsequent calls to
+    :py:func:`find_pattern_in_binary` for the same patterns are just a lookup.
+
+    Parameters
+    ----------
+    patterns:
+        The patterns to find. These are in the same format as for :py:func:`find_pattern_in_binary`.
+    binary:
+        The binary to search within. If not provided this will be the main binary.
+    executable_only:
+        If True, only search the sections of the binary which contain executable code. This is much faster
+        but should only be used for patterns which are known to be for functions.
+
+    Returns
+    -------
+    A mapping of each pattern to its offset relative to the start of the binary, or None if it wasn't found.
+    """
+    if binary is None:
+        binary = _internal.EXE_NAME
+    results: dict[str, Optional[int]] = {}
+    # Group the patterns which haven't been found yet by their anchor bytes. Checking whether the anchor is in
+    # a block of memory is a much cheaper search than running the full regex, and only needs doing once for
+    # all the patterns which share it.
+    remaining: dict[bytes, dict[str, _ParsedPattern]] = {}
+    for pattern in patterns:
+        if pattern in results:
+            continue
+        if (_cached_offset := cache.offset_cache.get(pattern, binary)) is not None:
+            results[pattern] = _cached_offset
+        else:
+            results[pattern] = None
+            parsed_pattern = _parse_pattern(pattern)
+            remaining.setdefault(parsed_pattern.anchor, {})[pattern] = parsed_pattern
+    if not remaining:
+        return results
+    hm = _get_binary_info(binary)
+    if not hm:
+        return results
+    handle, module = hm
+    base_address = module.lpBaseOfDll
+    search_ranges = []
+    if executable_only:
+        search_ranges = get_executable_ranges(binary)
+    if not search_ranges:
+        search_ranges = [(0, module.SizeOfImage)]
+    found_any = False
+    # `regex` can release the GIL while searching (`concurrent=True`), so search for each group of patterns in
+    # its own thread. We use threads rather than processes since a new process would be started using the
+    # binary we are injected into rather than python.
+    if len(remaining) > 1:
+        executor_ctx = ThreadPoolExecutor(
+            min(len(remaining), os.cpu_count() or 1),
+            thread_name_prefix="pyMHF_Pattern_Scanner",
+        )
+    else:
+        executor_ctx = nullcontext()
+    with executor_ctx as executor:
+        for range_start, range_size in search_ranges:
+            page_address = base_address + range_start
+            max_address = page_address + range_size
+            while remaining and page_address < max_address:
+                mbi = pymem.memory.virtual_query(handle, page_address)
+                next_region = min(mbi.BaseAddress + mbi.RegionSize, max_address)
+                if mbi.state == MEMORY_STATE.MEM_COMMIT and mbi.protect in SCANNABLE_PROTECTIONS:
+                    page_bytes = pymem.memory.read_bytes(handle, page_address, next_region - page_address)
+                    groups = list(remaining.items())
+                    search = partial(_search_anchored_patterns, page_bytes)
+                    if executor is not None:
+                        group_results = executor.map(lambda group: search(*group), groups)
+                    else:
+                        group_results = (search(*group) for group in groups)
+                    for (anchor, anchored_patterns), found in zip(groups, group_results):
+                        for pattern, page_offset in found:
+                            _offset = page_address + page_offset - base_address
+                            logger.debug("Found %s at 0x%X for binary %s", pattern, _offset, binary)
+                            results[pattern] = _offset
+                            cache.offset_cache.set(pattern, _offset, binary, False)
+                            found_any = True
+                            del anchored_patterns[pattern]
+                        if not anchored_patterns:
+                            del remaining[anchor]
+                page_address = next_region
+    # Only write the cache to disk once for the whole batch.
+    if found_any:
+        cache.offset_cache.save()
+    return results
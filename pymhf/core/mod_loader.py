@@ -11,7 +11,6 @@ import logging
 import os
 import os.path as op
 import sys
-import traceback
 from abc import ABC
 from dataclasses import fields
 from functools import partial
@@ -25,6 +24,7 @@ from packaging.version import parse as parse_version
 import pymhf.core._internal as _internal
 from pymhf.core._types import CustomTriggerProtocol, HookProtocol, KeyPressProtocol
 from pymhf.core.errors import NoSaveError
+from pymhf.core.functions import _get_parameters
 from pymhf.core.hooking import HookManager
 
 if TYPE_CHECKING:
@@ -66,6 +66,11 @@ if TYPE_CHECKING:
 logger = logging.getLogger(__name__)
 
 
+def _takes_arguments(func) -> bool:
+    """Determine whether the function takes any arguments other than ``self``."""
+    return any(name != "self" for name, _ in _get_parameters(func))
+
+
 def _is_mod_predicate(obj, ref_module) -> bool:
     if inspect.getmodule(obj) == ref_module and inspect.isclass(obj):
         return issubclass(obj, Mod) and not getattr(obj, "_disabled", False)
@@ -287,11 +292,10 @@ class Mod(ABC):
                         # If we haven't specified a method, then set it automatically depending on the object.
                         # We'll inspect the function. If we have no args, go with a GET, otherwise go with
                         # a PUT request.
-                        sig = set(inspect.signature(obj).parameters.keys()) - {"self"}
-                        if len(sig) == 0:
-                            method = "GET"
-                        else:
+                        if _takes_arguments(obj):
                             method = "PUT"
+                        else:
+                            method = "GET"
                         setattr(
                             obj,
                             "_api_endpoint",
@@ -403,7 +407,7 @@ class ModManager:
                 f"The file {module.__file__} has more than one mod defined in it. "
                 "Only define one mod per file."
             )
-        mod_name = list(d.keys())[0]
+        mod_name = next(iter(d))
         mod = d[mod_name]
         if mod.__pymhf_required_version__ is not None:
             from pymhf import __version__ as _pymhf_version
@@ -545,8 +549,7 @@ class ModManager:
             )
             return None
         # First register each of the methods which are detours.
-        for hook in _mod.hooks:
-            self.hook_manager.register_hook(hook)
+        self.hook_manager.register_hooks(_mod.hooks)
         # Add any custom callbacks which may be defined by the calling library.
         self.hook_manager._add_custom_callbacks(_mod._custom_callbacks)
         # Finally, set up any keyboard bindings.
@@ -626,7 +629,7 @@ class ModManager:
 
                 modules_to_reload = []
                 if gui.module_reload_enabled:
-                    logger.debug(f"reloading {module.__file__} and related modules")
+                    logger.debug("reloading %s and related modules", module.__file__)
                     mod_dir = op.dirname(module.__file__)
                     venv_dir = op.join(mod_dir, ".venv")
                     # Loop through sys.modules and find any files in the same directory.
@@ -658,7 +661,7 @@ class ModManager:
                     for _module_name, _module_fpath in modules_to_reload:
                         del sys.modules[_module_name]
                         import_file(_module_fpath)
-                        logger.debug(f"Reimported {_module_name} at {_module_fpath}")
+                        logger.debug("Reimported %s at %s", _module_name, _module_fpath)
                 new_module = self.load_mod(module.__file__)
                 for _mod in self._preloaded_mods.values():
                     mod = self.instantiate_mod(_mod)
@@ -683,15 +686,15 @@ class ModManager:
                                             # re-instantiate it so that we can get any potential changes to
                                             # it.
                                             member_req_reinst[member] = member_type
-                                            logger.debug(f"{member}: {_module}")
+                                            logger.debug("%s: %s", member, _module)
                             logger.debug(
-                                f"Reinstantiating the following members: {list(member_req_reinst.keys())}"
+                                "Reinstantiating the following members: %s", list(member_req_reinst.keys())
                             )
                             deleted_types = set()
                             for _name, type_ in member_req_reinst.items():
                                 data_offset = get_addressof(type_)
                                 new_obj_type_name = type_.__class__.__name__
-                                logger.debug(f"{_name} is of type {new_obj_type_name}")
+                                logger.debug("%s is of type %s", _name, new_obj_type_name)
                                 new_obj_type = getattr(new_module, new_obj_type_name)
                                 new_obj = map_struct(data_offset, new_obj_type)
                                 setattr(state, _name, new_obj)
@@ -728,7 +731,7 @@ class ModManager:
             else:
                 logger.error(f"Cannot find mod {name}")
         except Exception:
-            logger.error(traceback.format_exc())
+            logger.exception(f"There was an issue reloading {name}")
 
 
 mod_manager = ModManager()
@@ -515,7 +515,7 @@ class GUI:
             dpg.set_primary_window(WINDOW_TITLE, True)
             self.hwnd = win32gui.FindWindow(None, WINDOW_TITLE)
             if self.tabs:
-                self._current_tab = list(self.tabs.values())[0]
+                self._current_tab = next(iter(self.tabs.values()))
             while dpg.is_dearpygui_running():
                 # For each tracking variable, update the value.
                 for tag, vars in self.tracking_variables.get(self._current_tab, {}).items():
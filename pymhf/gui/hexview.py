@@ -226,7 +226,7 @@ class HexView:
             self._load_snapshot(new_snapshot_tag)
             dpg.set_value("_snapshot_dropdown", new_snapshot_tag)
         elif len(self._memory_cache) > 0:
-            new_snapshot_tag = list(self._memory_cache.keys())[0]
+            new_snapshot_tag = next(iter(self._memory_cache))
             self._load_snapshot(new_snapshot_tag)
             dpg.set_value("_snapshot_dropdown", new_snapshot_tag)
         else:
@@ -294,7 +294,7 @@ try:
                     Please do so so that you can load mods."""
                 )
     except Exception:
-        logging.error(traceback.format_exc())
+        logging.exception("There was an issue loading the mods")
     _mods_str = "mod"
     if _loaded_mods != 1:
         _mods_str = "mods"
@@ -331,7 +331,7 @@ try:
 
         # Loop over the mods which have been loaded and add any api routes which have been found.
         for mod in mod_manager.mods.values():
-            if sum(len(x) for x in mod._http_endpoints.values()) == 0:
+            if not any(mod._http_endpoints.values()):
                 # If we have no endpoints for a mod, then skip this step for it.
                 continue
             # Create a router for each mod so that we can logically group endpoints.
@@ -405,8 +405,7 @@ except Exception:
         with open(op.join(_internal.CWD, "CRITICAL_ERROR.txt"), "w") as f:
             traceback.print_exc(file=f)
             if socket_logger_loaded:
-                logging.error("An error occurred while loading pymhf:")
-                logging.error(traceback.format_exc())
+                logging.exception("An error occurred while loading pymhf:")
     except Exception:
         with open(op.join(op.expanduser("~"), "CRITICAL_ERROR.txt"), "w") as f:
             traceback.print_exc(file=f)
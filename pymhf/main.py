@@ -451,7 +451,7 @@ def run_module(
             # Only one thing. For now, we just set these as the `binary_base` and `binary_size`.
             # TODO: When we want to support offsets and hooks in multiple assemblies we need to pass the whole
             # dictionary in potentially, or do a lookup from inside the process.
-            assem_name = list(offset_map.keys())[0]
+            assem_name = next(iter(offset_map))
             binary_base = offset_map[assem_name][0]
             binary_size = offset_map[assem_name][1]
         else:
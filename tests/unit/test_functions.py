@@ -1,11 +1,15 @@
 import ctypes
+import functools
+import inspect
 import re
 from typing import Annotated
 
 import pytest
 from typing_extensions import Self
 
-from pymhf.core.functions import ArgData, FuncDef, _get_funcdef
+from pymhf.core.functions import ArgData, FuncDef, _get_funcdef, _get_parameters
+
+EMPTY = inspect.Parameter.empty
 
 
 def test_funcdef_flatten():
@@ -27,6 +31,15 @@ def test_funcdef_flatten():
     assert fd.flatten(a=1, b=3, c=5) == [1, 3, 5]
 
 
+def test_funcdef_to_FUNCDEF():
+    """Test that the FUNCDEF is only created once for a FuncDef."""
+    fd = FuncDef(ctypes.c_uint32, [ArgData("a", ctypes.c_uint32), ArgData("b", ctypes.c_uint64)])
+    func_def = fd.to_FUNCDEF()
+    assert func_def.restype == ctypes.c_uint32
+    assert func_def.argtypes == [ctypes.c_uint32, ctypes.c_uint64]
+    assert fd.to_FUNCDEF() is func_def
+
+
 def test_funcdef_flatten_with_defaults():
     """Test flattening arguments when the FuncDef has default values."""
     fd = FuncDef(
@@ -187,3 +200,76 @@ def test_get_funcdef_method():
         match="Return type must be a subclass of a ctypes.Structure or a simple ctypes type",
     ):
         fd = _get_funcdef(MyClass.thing7)
+
+
+def _signature_parameters(func):
+    return [(name, param.default) for name, param in inspect.signature(func).parameters.items()]
+
+
+def test_get_parameters():
+    """Test that the parameters read from the code object match those from the signature."""
+
+    def positional(a, b, c):
+        pass
+
+    def defaults(a, b=1, c="c"):
+        pass
+
+    def kwonly(a, *, b, c=2):
+        pass
+
+    def varargs(a, *args, b=3, **kwargs):
+        # Local variables come after the arguments in the code object.
+        x = 1  # noqa: F841
+
+    def no_args():
+        pass
+
+    assert _get_parameters(positional) == [("a", EMPTY), ("b", EMPTY), ("c", EMPTY)]
+    assert _get_parameters(defaults) == [("a", EMPTY), ("b", 1), ("c", "c")]
+    assert _get_parameters(kwonly) == [("a", EMPTY), ("b", EMPTY), ("c", 2)]
+    assert _get_parameters(varargs) == [("a", EMPTY), ("args", EMPTY), ("b", 3), ("kwargs", EMPTY)]
+    assert _get_parameters(no_args) == []
+    for func in (positional, defaults, kwonly, varargs, no_args):
+        assert _get_parameters(func) == _signature_parameters(func)
+
+
+def test_get_parameters_method():
+    """Test that the bound argument of a method isn't included."""
+
+    class Thing:
+        def method(self, a, *, _result_=None):
+            pass
+
+    assert _get_parameters(Thing.method) == [("self", EMPTY), ("a", EMPTY), ("_result_", None)]
+    assert _get_parameters(Thing().method) == [("a", EMPTY), ("_result_", None)]
+    assert _get_parameters(Thing().method) == _signature_parameters(Thing().method)
+
+
+def test_get_parameters_method_varargs():
+    """Test that `*args` isn't dropped from a bound method which has no other positional arguments."""
+
+    class Thing:
+        def method(*args, _result_=None):
+            pass
+
+    assert _get_parameters(Thing().method) == [("args", EMPTY), ("_result_", None)]
+    assert _get_parameters(Thing().method) == _signature_parameters(Thing().method)
+
+
+def test_get_parameters_wrapped():
+    """Test that the parameters of a function wrapped by a decorator are those of the wrapped function."""
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return func(*args, **kwargs)
+
+        return wrapper
+
+    @decorator
+    def wrapped(self, a, b=4):
+        pass
+
+    assert _get_parameters(wrapped) == [("self", EMPTY), ("a", EMPTY), ("b", 4)]
+    assert _get_parameters(functools.partial(wrapped, 1)) == [("a", EMPTY), ("b", 4)]
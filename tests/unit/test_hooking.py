@@ -0,0 +1,187 @@
+import ctypes
+import functools
+
+from pymhf.core._types import FUNCDEF, DetourTime
+from pymhf.core.hooking import _MAX_UNROLLED_BEFORE, FuncHook, _has_result_param, _set_detour_time
+
+
+def test_has_result_param():
+    """Test determining whether a detour takes the `_result_` argument."""
+
+    def with_result(self, a, _result_):
+        pass
+
+    def with_kwonly_result(self, a, *, _result_=None):
+        pass
+
+    def without_result(self, a, *args, **kwargs):
+        pass
+
+    assert _has_result_param(with_result)
+    assert _has_result_param(with_kwonly_result)
+    assert not _has_result_param(without_result)
+
+
+def test_has_result_param_wrapped():
+    """Test that the `_result_` argument of a detour wrapped by another decorator is still found."""
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return func(*args, **kwargs)
+
+        return wrapper
+
+    @decorator
+    def detour(self, a, _result_):
+        pass
+
+    assert _has_result_param(detour)
+    _set_detour_time(detour, DetourTime.AFTER)
+    assert detour._has__result_ is True
+
+
+class _TestHook:
+    """Just enough of a FuncHook to select its dispatcher and run it without binding it with minhook."""
+
+    add_detour = FuncHook.add_detour
+    remove_detour = FuncHook.remove_detour
+    _determine_detour_list = FuncHook._determine_detour_list
+    _remove_from_detour_list = FuncHook._remove_from_detour_list
+    _update_dispatcher = FuncHook._update_dispatcher
+    _set_dispatcher = FuncHook._set_dispatcher
+    _disable_failed_detour = FuncHook._disable_failed_detour
+    _compound_detour = FuncHook._compound_detour
+
+    def __init__(self, calls: list):
+        self._func_def = FUNCDEF(restype=ctypes.c_int32, argtypes=[ctypes.c_int32, ctypes.c_int32])
+        self._has_noop = False
+        self._before_detours = {}
+        self._after_detours = {}
+        self._after_detours_with_results = {}
+        self._disabled_detours = set()
+        self._active_detours = set()
+        self._oneshot_detours = {}
+        self._dispatcher = self._compound_detour
+        self._entry_namespace = None
+
+        def original(a, b):
+            calls.append(("original", a, b))
+            return a * b
+
+        self.original = original
+
+
+def _make_detour(
+    calls: list,
+    name: str,
+    detour_time: DetourTime,
+    ret=None,
+    has_result: bool = False,
+    noop: bool = False,
+    one_shot: bool = False,
+):
+    if has_result:
+
+        def detour(a, b, _result_):
+            calls.append((name, a, b, _result_))
+            return ret
+    else:
+
+        def detour(a, b):
+            calls.append((name, a, b))
+            return ret
+
+    detour._hook_func_name = name
+    detour._hook_time = detour_time
+    detour._has__result_ = has_result
+    detour._noop = noop
+    detour._is_one_shot = one_shot
+    return detour
+
+
+def _compare_dispatchers(detours: list[dict], dispatcher_name: str, n_calls: int = 1):
+    """Check that the dispatcher selected for the detours does the same thing as `_compound_detour`."""
+    hooks = []
+    for _ in range(2):
+        calls = []
+        hook = _TestHook(calls)
+        for kwargs in detours:
+            hook.add_detour(_make_detour(calls, **kwargs), update_dispatcher=False)
+        hook._update_dispatcher()
+        hooks.append((hook, calls))
+    (hook, calls), (compound_hook, compound_calls) = hooks
+    assert hook._dispatcher.__name__ == dispatcher_name
+    for i in range(n_calls):
+        assert hook._dispatcher(2, 3 + i) == compound_hook._compound_detour(2, 3 + i)
+    assert calls == compound_calls
+
+
+def test_dispatcher_unrolled():
+    """Test the dispatcher which calls each before detour without a loop."""
+    detours = [
+        {"name": "before_0", "detour_time": DetourTime.BEFORE},
+        {"name": "before_1", "detour_time": DetourTime.BEFORE, "ret": (4, 5)},
+        {"name": "before_2", "detour_time": DetourTime.BEFORE},
+    ]
+    _compare_dispatchers(detours, "_before_unrolled")
+    _compare_dispatchers(detours[:1], "_single_before")
+
+
+def test_dispatcher_looped():
+    """Test the dispatcher which loops over the before detours when there are too many to unroll."""
+    detours = [{"name": f"before_{i}", "detour_time": DetourTime.BEFORE} for i in range(_MAX_UNROLLED_BEFORE)]
+    _compare_dispatchers(detours, "_before_unrolled")
+    detours.append({"name": "last", "detour_time": DetourTime.BEFORE, "ret": (7, 8)})
+    _compare_dispatchers(detours, "_before_only")
+
+
+def test_dispatcher_after_with_result():
+    """Test the dispatchers for after detours which take the `_result_` argument."""
+    after_with_result = {"name": "with_result", "detour_time": DetourTime.AFTER, "has_result": True, "ret": 9}
+    after = {"name": "after", "detour_time": DetourTime.AFTER, "ret": 10}
+    before = {"name": "before", "detour_time": DetourTime.BEFORE, "ret": (4, 5)}
+    _compare_dispatchers([after_with_result], "_single_after_with_result")
+    _compare_dispatchers([after], "_single_after")
+    _compare_dispatchers([after_with_result, after], "_after_only")
+    _compare_dispatchers([before, after_with_result, after], "_before_and_after")
+
+
+def test_dispatcher_noop():
+    """Test that the original function isn't called if one of the before detours is a NOOP."""
+    detours = [
+        {"name": "noop", "detour_time": DetourTime.BEFORE, "ret": 11, "noop": True},
+        {"name": "before", "detour_time": DetourTime.BEFORE},
+    ]
+    _compare_dispatchers(detours, "_noop_before_only")
+    # There's no specialised dispatcher for NOOP's with after detours.
+    _compare_dispatchers([*detours, {"name": "after", "detour_time": DetourTime.AFTER}], "_compound_detour")
+
+
+def test_dispatcher_one_shot():
+    """Test that a one-shot detour is only run the first time the hooked function is called."""
+    detours = [
+        {"name": "one_shot", "detour_time": DetourTime.BEFORE, "ret": (4, 5), "one_shot": True},
+        {"name": "before", "detour_time": DetourTime.BEFORE},
+        {"name": "after", "detour_time": DetourTime.AFTER, "ret": 12, "one_shot": True},
+        {"name": "with_result", "detour_time": DetourTime.AFTER, "has_result": True},
+    ]
+    _compare_dispatchers(detours, "_before_and_after", n_calls=3)
+
+
+def test_remove_detour_with_one_shot_noop():
+    """Test that a pending one-shot NOOP detour still stops the original function being called after another
+    before detour is removed."""
+    calls = []
+    hook = _TestHook(calls)
+    hook.add_detour(
+        _make_detour(calls, "one_shot", DetourTime.BEFORE, ret=11, noop=True, one_shot=True),
+        update_dispatcher=False,
+    )
+    before = _make_detour(calls, "before", DetourTime.BEFORE)
+    hook.add_detour(before)
+    hook.remove_detour(before)
+    assert hook._has_noop
+    assert hook._dispatcher.__name__ == "_noop_before_only"
+    assert hook._dispatcher(2, 3) is None
+    assert calls == [("one_shot", 2, 3)]
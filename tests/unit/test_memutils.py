@@ -0,0 +1,208 @@
+import ctypes
+import types
+from ctypes import wintypes
+
+import pytest
+import regex
+
+import pymhf.core.caching as cache
+import pymhf.core.memutils as memutils
+from pymhf.core.memutils import (
+    _parse_pattern,
+    _search_anchored_patterns,
+    find_pattern_in_binary,
+    find_patterns_in_binary,
+    get_executable_ranges,
+)
+from pymhf.utils.winapi import (
+    IMAGE_DOS_HEADER,
+    IMAGE_DOS_SIGNATURE,
+    IMAGE_FILE_HEADER,
+    IMAGE_NT_SIGNATURE,
+    IMAGE_SCN_MEM_EXECUTE,
+    IMAGE_SCN_MEM_WRITE,
+    IMAGE_SECTION_HEADER,
+)
+
+# 4 regions of 256 bytes, each containing every byte value in order.
+MEMORY = bytes(range(256)) * 4
+REGION_SIZE = 256
+BASE_ADDRESS = 0x10000
+BINARY = "test.exe"
+
+
+@pytest.fixture
+def binary(monkeypatch):
+    """Make the pattern scanning functions search `MEMORY` instead of a real binary."""
+    module = types.SimpleNamespace(lpBaseOfDll=BASE_ADDRESS, SizeOfImage=len(MEMORY))
+
+    def virtual_query(handle, address):
+        return types.SimpleNamespace(
+            BaseAddress=address - address % REGION_SIZE,
+            RegionSize=REGION_SIZE,
+            state=memutils.MEMORY_STATE.MEM_COMMIT,
+            protect=next(iter(memutils.SCANNABLE_PROTECTIONS)),
+        )
+
+    def read_bytes(handle, address, size):
+        return MEMORY[address - BASE_ADDRESS : address - BASE_ADDRESS + size]
+
+    def pattern_scan_module(handle, module, pattern, return_multiple=False):
+        if (match := regex.search(pattern, MEMORY, regex.DOTALL)) is not None:
+            return module.lpBaseOfDll + match.start()
+
+    offset_cache = cache.OffsetCache()
+    monkeypatch.setattr(offset_cache, "save", lambda: None)
+    monkeypatch.setattr(cache, "offset_cache", offset_cache)
+    monkeypatch.setattr(memutils, "_get_binary_info", lambda binary: (1, module))
+    monkeypatch.setattr(memutils.pymem.memory, "virtual_query", virtual_query)
+    monkeypatch.setattr(memutils.pymem.memory, "read_bytes", read_bytes)
+    monkeypatch.setattr(memutils.pymem.pattern, "pattern_scan_module", pattern_scan_module)
+
+
+def test_parse_pattern():
+    """Test that the longest run of fixed bytes is chosen as the anchor."""
+    parsed = _parse_pattern("48 8B ?? 11 22 33 ?? 44")
+    assert parsed.lead == 0
+    assert parsed.anchor == b"\x11\x22\x33"
+    assert parsed.anchor_offset == 3
+
+    # The anchor offset is relative to the pattern once the leading wildcards are removed.
+    parsed = _parse_pattern("?? ? 48 8B ?? 11 22 33")
+    assert parsed.lead == 2
+    assert parsed.anchor == b"\x11\x22\x33"
+    assert parsed.anchor_offset == 3
+    assert parsed.regex.pattern == rb"\x48\x8B.\x11\x22\x33"
+
+    # The first run is used if there is more than one of the same length.
+    parsed = _parse_pattern("AA BB ?? CC DD")
+    assert parsed.anchor == b"\xaa\xbb"
+    assert parsed.anchor_offset == 0
+
+
+def test_parse_pattern_all_wildcards():
+    """Test that a pattern of only wildcards isn't trimmed and has no anchor."""
+    parsed = _parse_pattern("?? ?? ??")
+    assert parsed.lead == 0
+    assert parsed.anchor == b""
+    assert parsed.regex.pattern == b"..."
+
+
+def test_search_anchored_patterns():
+    """Test finding the first match of patterns which share an anchor."""
+    data = b"\x00\x11\x22\x33\x44\x00\x55\x01\x11\x22\x33\x44\x00\x66"
+    patterns = ["11 22 33 44 ?? 66", "?? 11 22 33 44 ?? 55", "11 22 33 44 ?? 77"]
+    anchored_patterns = {pattern: _parse_pattern(pattern) for pattern in patterns}
+    assert {p.anchor for p in anchored_patterns.values()} == {b"\x11\x22\x33\x44"}
+    found = _search_anchored_patterns(data, b"\x11\x22\x33\x44", anchored_patterns)
+    assert dict(found) == {"11 22 33 44 ?? 66": 8, "?? 11 22 33 44 ?? 55": 0}
+
+
+def test_search_anchored_patterns_all_wildcards():
+    """Test that patterns with no anchor are still found."""
+    found = _search_anchored_patterns(b"\x00\x01\x02", b"", {"?? ??": _parse_pattern("?? ??")})
+    assert found == [("?? ??", 0)]
+
+
+def test_search_anchored_patterns_start_of_region():
+    """Test that a match is ignored if there isn't room for the leading wildcards before it."""
+    for pattern in ("?? ?? 48 8B 05 11", "?? ?? 48 8B"):
+        parsed = _parse_pattern(pattern)
+        assert _search_anchored_patterns(b"\x48\x8b\x05\x11\x00", parsed.anchor, {pattern: parsed}) == []
+        found = _search_anchored_patterns(
+            b"\x48\x8b\x05\x11\x48\x8b\x05\x11", parsed.anchor, {pattern: parsed}
+        )
+        assert found == [(pattern, 2)]
+
+
+def test_find_patterns_in_binary(binary):
+    """Test finding a number of patterns in a binary at once."""
+    patterns = ["10 11 ?? 13", "?? 21 22", "FF 00 01", "AA AB", "AA ?? AC", "FF AA"]
+    assert find_patterns_in_binary(patterns, BINARY) == {
+        "10 11 ?? 13": 0x10,
+        "?? 21 22": 0x20,
+        # This spans two regions so can't be found.
+        "FF 00 01": None,
+        "AA AB": 0xAA,
+        "AA ?? AC": 0xAA,
+        "FF AA": None,
+    }
+    assert cache.offset_cache.get("10 11 ?? 13", BINARY) == 0x10
+    assert cache.offset_cache.get("FF AA", BINARY) is None
+
+
+def test_find_patterns_in_binary_start_of_region(binary):
+    """Test that a pattern with leading wildcards isn't matched in the first bytes of a region."""
+    assert find_patterns_in_binary(["?? ?? 00 01 02 03"], BINARY) == {"?? ?? 00 01 02 03": None}
+    assert find_patterns_in_binary(["?? ?? 02 03 04 05"], BINARY) == {"?? ?? 02 03 04 05": 0}
+
+
+def test_find_patterns_agrees(binary):
+    """Test that scanning for patterns at once gives the same offsets as scanning for them one at a time."""
+    patterns = [
+        "10 11 ?? 13",
+        "?? 21 22",
+        "?? ?? 02 03",
+        "AA ?? AC",
+        "?? ?? ??",
+        "40 41 42 43 44 ?? 46",
+        "E8",
+    ]
+    batch_results = find_patterns_in_binary(patterns, BINARY)
+    cache.offset_cache._lookup.clear()
+    for pattern in patterns:
+        assert find_pattern_in_binary(pattern, False, BINARY) == batch_results[pattern]
+
+
+def test_find_pattern_in_binary_start_of_binary(binary):
+    """Test that a pattern with leading wildcards can't give an offset before the start of the binary."""
+    assert find_pattern_in_binary("?? ?? 00 01", False, BINARY) == 0xFE
+
+
+def _make_pe_headers(sections: list[tuple[bytes, int, int, int, int]], dos_magic: int = IMAGE_DOS_SIGNATURE):
+    """Create the headers of a PE file with the given (name, virtual size, virtual address, raw size,
+    characteristics) sections."""
+    dos_header = IMAGE_DOS_HEADER(e_magic=dos_magic, e_lfanew=0x80)
+    file_header = IMAGE_FILE_HEADER(NumberOfSections=len(sections), SizeOfOptionalHeader=0x10)
+    headers = bytearray(bytes(dos_header).ljust(0x80, b"\x00"))
+    headers += bytes(wintypes.DWORD(IMAGE_NT_SIGNATURE))
+    headers += bytes(file_header)
+    headers += bytes(0x10)
+    for name, virtual_size, virtual_address, raw_size, characteristics in sections:
+        section_header = IMAGE_SECTION_HEADER(
+            VirtualAddress=virtual_address,
+            SizeOfRawData=raw_size,
+            Characteristics=characteristics,
+        )
+        section_header.Name[: len(name)] = name
+        section_header.Misc.VirtualSize = virtual_size
+        headers += bytes(section_header)
+    return bytes(headers)
+
+
+def test_get_executable_ranges(monkeypatch):
+    """Test getting the executable sections of a binary from its PE headers."""
+    headers = _make_pe_headers(
+        [
+            (b".text", 0x100, 0x1000, 0x100, IMAGE_SCN_MEM_EXECUTE),
+            (b".data", 0x100, 0x2000, 0x100, IMAGE_SCN_MEM_WRITE),
+            # The raw size is used if the virtual size isn't set.
+            (b".text2", 0, 0x3000, 0x80, IMAGE_SCN_MEM_EXECUTE),
+            # This goes past the end of the binary so is clipped.
+            (b".text3", 0x2000, 0x3800, 0x2000, IMAGE_SCN_MEM_EXECUTE | IMAGE_SCN_MEM_WRITE),
+        ]
+    )
+    module = types.SimpleNamespace(lpBaseOfDll=BASE_ADDRESS, SizeOfImage=0x4000)
+
+    def read_ctype(handle, address, ctype):
+        ctypes.memmove(ctypes.addressof(ctype), headers[address - BASE_ADDRESS :], ctypes.sizeof(ctype))
+        if isinstance(ctype, (ctypes.Structure, ctypes.Array)):
+            return ctype
+        return ctype.value
+
+    monkeypatch.setattr(memutils, "_get_binary_info", lambda binary: (1, module))
+    monkeypatch.setattr(memutils.pymem.memory, "read_ctype", read_ctype)
+    assert get_executable_ranges(BINARY) == [(0x1000, 0x100), (0x3000, 0x80), (0x3800, 0x800)]
+
+    headers = _make_pe_headers([(b".text", 0x100, 0x1000, 0x100, IMAGE_SCN_MEM_EXECUTE)], dos_magic=0)
+    assert get_executable_ranges(BINARY) == []